@@ -2,7 +2,9 @@
 # coding: utf-8
 
 import streamlit as st
-import pandas as pd
+
+from utils import metrics
+from utils.warmup import start_warmup
 #from annotated_text import annotated_text
 
 st.set_page_config(
@@ -10,15 +12,10 @@ st.set_page_config(
     page_icon="🌎"
 )
 
-# Function to load data
-@st.cache
-def load_data():
-    DATA_URL = 'https://raw.githubusercontent.com/JesHP73/climanteinterlense/main/dataset/socio_economical_agg_dataset.csv'
-    data = pd.read_csv(DATA_URL)
-    return data
-
-# Load data
-df = load_data()
+# The rest of the page is static text; the rerun record covers the warm-up it starts
+with metrics.page_rerun('hello'):
+    # Load the datasets and build each page's default view while this page renders
+    start_warmup()
 
 st.markdown("""
     <h1 style='text-align: center;'>
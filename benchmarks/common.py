@@ -0,0 +1,104 @@
+# coding: utf-8
+
+"""Helpers shared by the benchmark scripts."""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT_DIR / "benchmarks" / "results"
+
+# Page scripts by the short names used in results files
+PAGES = {
+    "hello": "Hello.py",
+    "air_pollution_impact": "pages/Air_Pollution_Impact.py",
+    "who_standards_countries": "pages/who_standars_countries_beyond.py",
+    "gni_vs_air_pollution": "pages/GNI_vs_Air_Pollution.py",
+}
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile of a non-empty list, ``q`` in [0, 100]."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values):
+    """Distribution summary of a list of latencies in seconds."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "min": min(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+        "mean": sum(values) / len(values),
+    }
+
+
+def scenarios_for(page):
+    """Sidebar selections to sweep for a page, as ``{widget label: value}`` dicts.
+
+    Options are read from the local datasets so the sweep follows the data.
+    """
+    from utils.data_loader import load_dataset
+
+    if page == "who_standards_countries":
+        data = load_dataset("who_standards")
+        regions = sorted(data["region"].unique().tolist())
+        subsets = [["All"]] + [[region] for region in regions]
+        subsets += [[first, second] for i, first in enumerate(regions) for second in regions[i + 1:]]
+        return [
+            {"Select Pollutant": pollutant, "Select Region": subset}
+            for pollutant in sorted(data["air_pollutant"].unique().tolist())
+            for subset in subsets
+        ]
+
+    if page == "air_pollution_impact":
+        data = load_dataset("global_burden")
+        regions = sorted(data["region"].unique().tolist())
+        countries = sorted(data["country"].unique().tolist())
+        scenarios = [{"Select Region": ["All"], "Select Country": ["All"]}]
+        scenarios += [{"Select Region": [region], "Select Country": ["All"]} for region in regions]
+        scenarios += [{"Select Region": ["All"], "Select Country": [country]} for country in countries]
+        for region in regions:
+            in_region = sorted(data.loc[data["region"] == region, "country"].unique().tolist())
+            scenarios.append({"Select Region": [region], "Select Country": in_region})
+        scenarios.append({"Select Region": ["All"], "Select Country": countries})
+        return scenarios
+
+    if page == "gni_vs_air_pollution":
+        data = load_dataset("air_quality_gni")
+        pollutants = sorted(data["air_pollutant"].unique().tolist())
+        years = sorted(data["year"].unique().tolist(), reverse=True)
+        regions = ["All"] + sorted(data["region"].unique().tolist())
+        # Every pollutant and region for the latest year, then every year for each pollutant
+        scenarios = [
+            {"Select Pollutant": pollutant, "Select Year": years[0], "Select Region": region}
+            for pollutant in pollutants
+            for region in regions
+        ]
+        scenarios += [
+            {"Select Pollutant": pollutant, "Select Year": year, "Select Region": "All"}
+            for pollutant in pollutants
+            for year in years[1:]
+        ]
+        return scenarios
+
+    return [{}]
+
+
+def apply_selection(app, selection):
+    """Set the filter widgets of an ``AppTest`` by label, wherever they are drawn."""
+    widgets = list(app.multiselect) + list(app.selectbox)
+    for label, value in selection.items():
+        widget = next(widget for widget in widgets if widget.label == label)
+        widget.set_value(value)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Per-page startup import cost, measured with ``python -X importtime``.
+
+For each page the module-level imports are extracted from the script and
+executed in a fresh interpreter, so the numbers match what a newly started
+server process pays on the first execution of that page.
+
+Usage:
+    python benchmarks/import_time.py [--top 15] [--output benchmarks/results/imports.json]
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+from common import PAGES, RESULTS_DIR, ROOT_DIR
+
+
+def page_imports(script):
+    """Source of the top-level import statements of a page script."""
+    with open(ROOT_DIR / script, encoding="utf-8") as handle:
+        tree = ast.parse(handle.read())
+    statements = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in statements)
+
+
+def parse_importtime(stderr):
+    """Rows of (module, self_us, cumulative_us, depth) from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(source):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", source],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(ROOT_DIR)},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr)
+
+
+def report(page, script, top):
+    source = page_imports(script)
+    rows = measure(source)
+    # Top-level entries (the shallowest depth, usually 1) add up to the total
+    min_depth = min(row[3] for row in rows)
+    roots = [row for row in rows if row[3] == min_depth]
+    return {
+        "page": page,
+        "script": script,
+        "imports": source.splitlines(),
+        "total_ms": sum(row[2] for row in roots) / 1000,
+        "top_level_ms": {row[0]: row[2] / 1000 for row in sorted(roots, key=lambda r: -r[2])[:top]},
+        "slowest_self_ms": {row[0]: row[1] / 1000 for row in sorted(rows, key=lambda r: -r[1])[:top]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=sorted(PAGES))
+    parser.add_argument("--top", type=int, default=15, help="modules listed per page")
+    parser.add_argument("--output", default=None, help="results JSON path")
+    args = parser.parse_args()
+
+    results = [report(page, PAGES[page], args.top) for page in args.pages]
+
+    for result in results:
+        print(f"{result['page']}: {result['total_ms']:.1f} ms")
+        for module, ms in result["top_level_ms"].items():
+            print(f"    {ms:9.1f} ms  {module}")
+
+    if args.output:
+        output = args.output
+    else:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / "import_time.json"
+    with open(output, "w") as handle:
+        json.dump({"benchmark": "import_time", "pages": results}, handle, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
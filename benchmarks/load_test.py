@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Concurrent-session load generator for the app.
+
+Every simulated session is a separate process holding its own app-testing
+harness for each page: the harness's runtime is a per-process singleton and
+cannot be driven from several threads. Sessions therefore share what server
+processes on one host share (the dataset files, the Parquet cache and the
+SQLite result cache), not in-process caches. Each session first loads every
+page, waits for the others, then performs a random sequence of sidebar
+changes across the pages; the run is repeated for increasing session counts
+and reports throughput, rerun latency percentiles and the summed RSS of the
+session processes. Any failure (an exception in a page, a timed-out rerun, a
+crashed session) is counted in the level's errors.
+
+Usage:
+    python benchmarks/load_test.py [--sessions 1 2 4 8 16] [--steps 20]
+                                   [--pages air_pollution_impact who_standards_countries]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import time
+import traceback
+from datetime import datetime
+
+from common import PAGES, RESULTS_DIR, ROOT_DIR, apply_selection, scenarios_for, summarize
+
+
+def current_rss_kib(pid="self"):
+    """Resident set size of a process from /proc, or 0 when unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _timed_rerun(app, page, latencies, errors):
+    start = time.perf_counter()
+    try:
+        app.run()
+    except Exception as error:
+        # e.g. a rerun that exceeded the timeout
+        errors.append(f"{page}: {error!r}")
+        return
+    latencies.append((page, time.perf_counter() - start))
+    errors.extend(f"{page}: {exception.message}" for exception in app.exception)
+
+
+def run_session(index, pages, scenarios, steps, timeout, seed, ready, results):
+    """One session in its own process; puts ``(index, latencies, errors, started, finished)`` on ``results``."""
+    latencies, errors = [], []
+    started = finished = None
+    try:
+        from streamlit.testing.v1 import AppTest
+
+        rng = random.Random(seed)
+        apps = {}
+        for page in pages:
+            app = AppTest.from_file(str(ROOT_DIR / PAGES[page]), default_timeout=timeout)
+            app.run()
+            errors.extend(f"{page}: {exception.message}" for exception in app.exception)
+            apps[page] = app
+
+        # Start the measured steps of every session together; a session that
+        # failed to load its pages breaks the barrier instead of stalling the rest
+        ready.wait(timeout=timeout * (len(pages) + 1))
+        started = time.time()
+        for _ in range(steps):
+            page = rng.choice(pages)
+            app = apps[page]
+            apply_selection(app, rng.choice(scenarios[page]))
+            _timed_rerun(app, page, latencies, errors)
+        finished = time.time()
+    except Exception:
+        errors.append(f"session-{index}: {traceback.format_exc()}")
+        ready.abort()
+    results.put((index, latencies, errors, started, finished))
+
+
+def run_level(sessions, pages, scenarios, steps, timeout, seed):
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(sessions)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=run_session,
+            args=(i, pages, scenarios, steps, timeout, seed + i, ready, results),
+            name=f"session-{i}",
+        )
+        for i in range(sessions)
+    ]
+    for process in processes:
+        process.start()
+
+    # Collect results while sampling the sessions' summed RSS
+    latencies, errors, spans, reported = [], [], [], set()
+    rss_peak = 0
+    while len(reported) < sessions:
+        rss_peak = max(rss_peak, sum(current_rss_kib(process.pid) for process in processes))
+        try:
+            index, session_latencies, session_errors, started, finished = results.get(timeout=0.05)
+        except queue.Empty:
+            # A session that died without reporting (e.g. killed) will never report
+            for i, process in enumerate(processes):
+                if i not in reported and process.exitcode not in (None, 0):
+                    errors.append(f"session-{i}: exited with code {process.exitcode}")
+                    reported.add(i)
+            continue
+        reported.add(index)
+        latencies.extend(session_latencies)
+        errors.extend(session_errors)
+        if started is not None and finished is not None:
+            spans.append((started, finished))
+    for process in processes:
+        process.join()
+
+    # Wall time of the measured phase, from the first session's start to the last one's end
+    wall = max(end for _, end in spans) - min(begin for begin, _ in spans) if spans else 0.0
+    all_latencies = [seconds for _, seconds in latencies]
+    return {
+        "sessions": sessions,
+        "reruns": len(all_latencies),
+        "wall_seconds": wall,
+        "throughput_reruns_per_second": len(all_latencies) / wall if wall else 0.0,
+        "latency": summarize(all_latencies),
+        "latency_by_page": {
+            page: summarize([seconds for name, seconds in latencies if name == page]) for page in pages
+        },
+        "rss_peak_kib": rss_peak,
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--steps", type=int, default=20, help="sidebar changes per session")
+    parser.add_argument(
+        "--pages", nargs="+", choices=sorted(PAGES),
+        default=["air_pollution_impact", "who_standards_countries"],
+    )
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="results JSON path")
+    args = parser.parse_args()
+
+    os.chdir(ROOT_DIR)
+    scenarios = {page: scenarios_for(page) for page in args.pages}
+
+    levels = []
+    for sessions in args.sessions:
+        level = run_level(sessions, args.pages, scenarios, args.steps, args.timeout, args.seed)
+        levels.append(level)
+        latency = level["latency"]
+        print(
+            f"{sessions:>4} sessions  {level['throughput_reruns_per_second']:7.1f} reruns/s  "
+            f"p50 {latency.get('p50', 0) * 1000:7.1f} ms  p95 {latency.get('p95', 0) * 1000:7.1f} ms  "
+            f"p99 {latency.get('p99', 0) * 1000:7.1f} ms  RSS peak {level['rss_peak_kib'] / 1024:7.1f} MiB  "
+            f"errors {level['error_count']}"
+        )
+
+    output = args.output or RESULTS_DIR / f"load_test-{datetime.now():%Y%m%d-%H%M%S}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump({"benchmark": "load_test", "pages": args.pages, "steps": args.steps, "levels": levels}, handle, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
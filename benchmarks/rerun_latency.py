@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Headless rerun-latency benchmark for every page of the app.
+
+Each page is driven with Streamlit's app-testing harness against the local
+dataset/ files. For every page the script records a cold start (empty
+caches), then sweeps the sidebar space and records the latency of the first
+and repeated reruns of each selection, plus peak memory. Every page is
+measured in its own process, so its peak RSS is not inherited from the
+pages measured before it, and against a temporary shared result cache, so
+clearing it for cold starts cannot touch the cache of an app running on the
+same host.
+
+Usage:
+    python benchmarks/rerun_latency.py [--repeat 3] [--pages who_standards_countries]
+                                       [--output benchmarks/results/latest.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from common import PAGES, RESULTS_DIR, ROOT_DIR, apply_selection, scenarios_for, summarize
+
+import streamlit as st
+
+
+def clear_caches():
+    # Imported in the page's process, after main() pointed the shared cache elsewhere
+    from utils.figure_cache import figure_cache
+    from utils.registry import datasets
+    from utils.shared_cache import shared_cache
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    figure_cache.clear()
+    # The SQLite cache outlives the process; without this the cold start reads it warm
+    shared_cache.clear()
+    datasets.clear()
+
+
+def timed_run(app, timeout):
+    start = time.perf_counter()
+    app.run(timeout=timeout)
+    elapsed = time.perf_counter() - start
+    errors = [str(exception.message) for exception in app.exception]
+    return elapsed, errors
+
+
+def bench_page(page, repeat, timeout, limit=None):
+    """Results of one page; run in a fresh process per page."""
+    from streamlit.testing.v1 import AppTest
+
+    from utils.figure_cache import figure_cache
+
+    script = str(ROOT_DIR / PAGES[page])
+
+    # Cold start: empty caches and a fresh script run, traced for peak memory
+    clear_caches()
+    tracemalloc.start()
+    app = AppTest.from_file(script, default_timeout=timeout)
+    cold, errors = timed_run(app, timeout)
+    _, cold_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    scenarios = scenarios_for(page)[:limit]
+    records = []
+    first_runs, repeat_runs = [], []
+    for selection in scenarios:
+        samples = []
+        for _ in range(repeat):
+            apply_selection(app, selection)
+            elapsed, run_errors = timed_run(app, timeout)
+            samples.append(elapsed)
+            errors.extend(run_errors)
+        first_runs.append(samples[0])
+        repeat_runs.extend(samples[1:])
+        records.append({"selection": selection, "samples": samples})
+
+    return {
+        "page": page,
+        "script": PAGES[page],
+        "cold_start_seconds": cold,
+        "cold_start_peak_traced_bytes": cold_peak,
+        "warm_first_selection": summarize(first_runs),
+        "warm_repeat_selection": summarize(repeat_runs),
+        # This process only ever measured this page
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "figure_cache": figure_cache.stats(),
+        "scenarios": records,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=sorted(PAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="reruns per selection")
+    parser.add_argument("--limit", type=int, default=None, help="max selections per page")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per rerun")
+    parser.add_argument("--output", default=None, help="results JSON path")
+    args = parser.parse_args()
+
+    # Page scripts open images/ and dataset/ relative to the repository root
+    os.chdir(ROOT_DIR)
+
+    # The page processes inherit this before they import utils.config
+    cache_dir = tempfile.mkdtemp(prefix="rerun_latency-")
+    os.environ["CLIMATE_SHARED_CACHE_PATH"] = os.path.join(cache_dir, "results.sqlite")
+    context = multiprocessing.get_context("spawn")
+    try:
+        pages = []
+        for page in args.pages:
+            with context.Pool(1) as pool:
+                pages.append(pool.apply(bench_page, (page, args.repeat, args.timeout, args.limit)))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    results = {
+        "benchmark": "rerun_latency",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+        "pages": pages,
+    }
+
+    output = args.output or RESULTS_DIR / f"rerun_latency-{datetime.now():%Y%m%d-%H%M%S}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(results, handle, indent=2, default=str)
+
+    for page in results["pages"]:
+        print(
+            f"{page['page']:<26} cold {page['cold_start_seconds'] * 1000:8.1f} ms  "
+            f"warm p50 {page['warm_first_selection'].get('p50', 0) * 1000:7.1f} ms  "
+            f"repeat p50 {page['warm_repeat_selection'].get('p50', 0) * 1000:7.1f} ms  "
+            f"errors {len(page['errors'])}"
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
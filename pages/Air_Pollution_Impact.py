@@ -1,88 +1,48 @@
 import streamlit as st
 import pandas as pd
-#import seaborn as sns
-#import matplotlib.pyplot as plt
-import numpy as np
-import plotly.figure_factory as ff
-import scipy
-import plotly.express as px
+
+from utils.assets import image_variant
+from utils import metrics
+from utils.export import export_controls
+from utils.page_data import (
+    INCOME_GROUPS, air_animation_figure, air_exports, air_figure, air_selection, load_stats_index
+)
+from utils.refresher import start_refresher
+from utils.registry import Dataset, datasets
 
 # Function definitions
 
 # Function to load data
-@st.cache  # Corrected cache decorator
 def load_data():
+    # Current snapshot shared by every session; swapped in place by the background refresher
     try:
-        URL = 'https://raw.githubusercontent.com/JesHP73/climanteinterlense/main/dataset/global_bourden_risk_factor.csv'
-        data = pd.read_csv(URL)
-        return data
+        return datasets.get("global_burden")
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return pd.DataFrame()  # Return an empty DataFrame in case of error
+        return Dataset("global_burden", None, pd.DataFrame())  # Return an empty DataFrame in case of error
 
 
-def plot_data(filtered_data):
-    # Make sure the column is of numeric type
-    filtered_data['total_death_attributed_sex_standarized'] = pd.to_numeric(
-        filtered_data['total_death_attributed_sex_standarized'], errors='coerce'
-    )
+def plot_data(stats, countries, income_groups, selection, version, animate=False):
+    # Reuse the figure built for the same selection and dataset version; the
+    # animated figure carries every year as a frame that plays in the browser
+    with metrics.span('figure'):
+        if animate:
+            fig = air_animation_figure(stats, countries, income_groups, selection, version)
+        else:
+            fig = air_figure(stats, countries, income_groups, selection, version)
 
-    # Group by 'year' and 'ig_label', then calculate the mean of the standardized death total
-    aggregated_data = filtered_data.groupby(['year', 'ig_label'], as_index=False)['total_death_attributed_sex_standarized'].mean()
+    # Show the figure
+    with metrics.span('plotly_chart'):
+        st.plotly_chart(fig)
 
-    # Mapping from short labels to full names for income groups
-    income_label_mapping = {
-        'LM': 'Low Income',
-        #'UM': 'Upper Middle Income',
-        'H': 'High Income'
-    }
 
-    # Apply the mapping to the 'ig_label' column
-    aggregated_data['ig_label'] = aggregated_data['ig_label'].map(income_label_mapping)
-
-    # Define the color mapping for income groups
-    color_discrete_map = {
-        'Low Income': 'blue',
-        'High Income': 'green',
-        #'Upper Middle Income': 'grey'
-    }
+def display_statistics(stats, countries, income_groups):
+    latest_year, latest_means = stats.latest_means(countries, income_groups)
+    if latest_year is not None:
+        latest_avg_death_percentage = latest_means['total_death_attributed_sex_standarized']
 
-    # Plot the line chart using the aggregated data
-    fig = px.line(
-        aggregated_data,
-        x='year',
-        y='total_death_attributed_sex_standarized',
-        color='ig_label',
-        color_discrete_map=color_discrete_map,
-        labels={'total_death_attributed_sex_standarized': 'Percentage of Deaths', 'ig_label': 'Income Group'}
-    )
-
-    # Improve layout for better readability
-    fig.update_layout(
-        xaxis_title='Year',
-        yaxis_title='Percentage of population Deaths',
-        showlegend=True,
-        legend_title_text='Historical Income Group Clasification'
-    )
-
-    # Set x-axis tick marks to show each year
-    fig.update_xaxes(
-        tickvals=aggregated_data['year'].unique(),
-        tickangle=45
-    )
-
-     # Show the figure
-    st.plotly_chart(fig)
-
-
-def display_statistics(filtered_data):
-    if not filtered_data.empty:
-        latest_year = filtered_data['year'].max()
-        latest_data = filtered_data[filtered_data['year'] == latest_year]
-        latest_avg_death_percentage = latest_data['total_death_attributed_sex_standarized'].mean()
-
-        if 'people_affected' in latest_data.columns:
-            people_affected = latest_data['people_affected'].mean()
+        if 'people_affected' in latest_means:
+            people_affected = latest_means['people_affected']
         else:
             st.warning("Column 'people_affected' not found in the data.")
             people_affected = None
@@ -103,52 +63,78 @@ def display_statistics(filtered_data):
         st.error("Insufficient data to calculate statistics.")
 
 
-def main():
-    # Load data
-    original_data = load_data()
-    df = original_data.copy()
+# Chart and metrics fragment: a filter change reruns only this function, not
+# the infographic tab, the explanations or the expanders
+@st.fragment
+def income_chart():
+    with metrics.rerun_scope('air_pollution_impact'):
+        # Load data
+        with metrics.span('load_data'):
+            dataset = load_data()
+        df = dataset.frame
 
-    if df.empty:
-        st.error("No data available to display.")
-        return
+        with metrics.span('stats_index'):
+            stats = load_stats_index(dataset.version, df)
 
-    st.title(':green[Unequal Impact:] Air Pollution-Related Deaths by Income Group')
-    
-    st.divider()
-    
-    # Sidebar for filters
-    st.sidebar.header('Filters')
+        # Multiselect for Region and Country, inside the fragment (fragments cannot own sidebar widgets)
+        region_options = ['All'] + sorted(stats.regions.unique().tolist())
+        country_options = ['All'] + stats.countries.tolist()
 
-    # Multiselect for Region and Country
-    region_options = ['All'] + sorted(df['region'].unique().tolist())
-    country_options = ['All'] + sorted(df['country'].unique().tolist())
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_region = st.multiselect('Select Region', options=region_options, default='All')
+        with col2:
+            selected_country = st.multiselect('Select Country', options=country_options, default='All')
+        animate = st.toggle('Animate years', help='Play the years back in the chart; scrubbing needs no reruns')
 
-    selected_region = st.sidebar.multiselect('Select Region', options=region_options, default='All')
-    selected_country = st.sidebar.multiselect('Select Country', options=country_options, default='All')
+        metrics.set_selection(region=selected_region, country=selected_country, animate=animate)
 
-    # Apply regional and country filters
-    if 'All' not in selected_region:
-        df = df[df['region'].isin(selected_region)]
-    if 'All' not in selected_country:
-        df = df[df['country'].isin(selected_country)]
+        # Specify the income groups to filter on
+        income_groups = INCOME_GROUPS
 
-    # Specify the income groups to filter on
-    income_groups = ['LM', 'UM', 'H']  # Use the short labels if those are present in the 'ig_label' column
+        with metrics.span('filter'):
+            # Resolve the selection to country positions in the sufficient-statistics index
+            countries = stats.country_positions(
+                regions=None if 'All' in selected_region else selected_region,
+                countries=None if 'All' in selected_country else selected_country
+            )
 
-    # Filter the DataFrame to include only the specified income groups
-    filtered_data = df[df['ig_label'].isin(income_groups)]
+        if not stats.has_data(countries, income_groups):
+            st.error("No data available for the selected criteria.")
+            return
 
-    if filtered_data.empty:
-        st.error("No data available for the selected criteria.")
-        return
+        # Plotting
+        selection = air_selection(selected_region, selected_country, income_groups)
+        plot_data(stats, countries, income_groups, selection, dataset.version, animate)
+
+        # Exports are only encoded when asked for, in chunks
+        with metrics.span('export'):
+            export_controls(
+                'global_burden', dataset.version, selection,
+                air_exports(df, stats, countries, income_groups), key='air_export'
+            )
 
-    # Plotting
-    plot_data(filtered_data)
+        st.link_button(":blue[🔗 Data source: IHME, Global Burden of Disease (2019)]", "https://vizhub.healthdata.org/gbd-results/")
 
-    st.link_button(":blue[🔗 Data source: IHME, Global Burden of Disease (2019)]", "https://vizhub.healthdata.org/gbd-results/")
+        # Display statistics
+        with metrics.span('statistics'):
+            display_statistics(stats, countries, income_groups)
+
+
+def main():
+    # Load data
+    with metrics.span('load_data'):
+        dataset = load_data()
+
+    if dataset.frame.empty:
+        st.error("No data available to display.")
+        return
+
+    st.title(':green[Unequal Impact:] Air Pollution-Related Deaths by Income Group')
     
-    # Display statistics
-    display_statistics(filtered_data)
+    st.divider()
+
+    income_chart()
 
     # Define custom styles with green highlights
     custom_css = """
@@ -206,7 +192,8 @@ def show_page2():
     
     st.divider()
     
-    st.image("images/attributed_deaths_for_different_causes.jpg", width=700)
+    # Pre-resized variant: same bytes and media URL on every rerun
+    st.image(image_variant("images/attributed_deaths_for_different_causes.jpg", 700), width=700)
     st.write("**Creator:** European Environment Agency (EEA)")
     st.link_button(":blue[🔗 Data source: Harm to human health from air pollution in Europe: burden of disease Nov, 2023 Report]", "https://www.eea.europa.eu/publications/harm-to-human-health-from-air-pollution")
 
@@ -231,20 +218,20 @@ def show_page2():
 
 
 
-# Creating tabs
-tab1, tab2 = st.tabs(["Causes Of Mortality", "Analisys by Income Groups"])
+with metrics.page_rerun('air_pollution_impact'):
+    start_refresher()
 
-# Populate tab1 with page 1 content
-with tab1:
-    
-    page1_chart = show_page2() 
-    
+    # Creating tabs
+    tab1, tab2 = st.tabs(["Causes Of Mortality", "Analisys by Income Groups"])
+
+    # Populate tab1 with page 1 content
+    with tab1:
+
+        page1_chart = show_page2() 
 
 
-# Populate tab2 with page 2 content
-with tab2:
-    
-    page2 = plot_page1() 
-    
 
+    # Populate tab2 with page 2 content
+    with tab2:
 
+        page2 = plot_page1()
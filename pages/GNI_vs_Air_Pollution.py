@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import streamlit as st
+import pandas as pd
+
+from utils import metrics
+from utils.charts import INCOME_LABELS
+from utils.page_data import gni_animation_figure, gni_view_figure, load_gni_regressions
+from utils.refresher import start_refresher
+from utils.registry import Dataset, datasets
+
+
+# Function to load data
+def load_data():
+    # Current snapshot shared by every session; swapped in place by the background refresher
+    try:
+        return datasets.get("air_quality_gni")
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return Dataset("air_quality_gni", None, pd.DataFrame())  # Return an empty DataFrame in case of error
+
+
+def plot_data(df, fits, group_fits, selected_pollutant, selected_year, selected_region, version, animate=False):
+    # Reuse the figure built for the same selection and dataset version; the
+    # animated figure opens on the selected year and plays the others in the browser
+    with metrics.span('figure'):
+        if animate:
+            fig = gni_animation_figure(df, fits, selected_pollutant, selected_year, selected_region, version)
+        else:
+            fig = gni_view_figure(df, group_fits, selected_pollutant, selected_year, selected_region, version)
+
+    with metrics.span('plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def display_fits(group_fits):
+    table = group_fits.reset_index()
+    table['ig_label'] = table['ig_label'].map(INCOME_LABELS)
+    table = table.dropna(subset=['ig_label', 'slope'])
+
+    if table.empty:
+        st.warning("Not enough countries in the selection to fit a trend.")
+        return
+
+    st.dataframe(
+        table[['ig_label', 'n', 'slope', 'r', 'r2']].rename(columns={
+            'ig_label': 'Income Group',
+            'n': 'Countries',
+            'slope': 'Change per 1,000 GNI',
+            'r': 'Correlation',
+            'r2': 'R²'
+        }).assign(**{'Change per 1,000 GNI': lambda x: x['Change per 1,000 GNI'] * 1000}),
+        hide_index=True,
+        use_container_width=True
+    )
+
+
+# Chart and fits fragment: a filter change reruns only this function
+@st.fragment
+def gni_chart():
+    with metrics.rerun_scope('gni_vs_air_pollution'):
+        # Load data
+        with metrics.span('load_data'):
+            dataset = load_data()
+        df = dataset.frame
+
+        pollutant_options = sorted(df['air_pollutant'].unique().tolist())
+        year_options = sorted(df['year'].unique().tolist(), reverse=True)
+        region_options = ['All'] + sorted(df['region'].unique().tolist())
+
+        # Filters inside the fragment (fragments cannot own sidebar widgets)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            selected_pollutant = st.selectbox('Select Pollutant', options=pollutant_options)
+        with col2:
+            selected_year = st.selectbox('Select Year', options=year_options)
+        with col3:
+            selected_region = st.selectbox('Select Region', options=region_options)
+        animate = st.toggle('Animate years', help='Play the years back in the chart; scrubbing needs no reruns')
+
+        metrics.set_selection(pollutant=selected_pollutant, year=selected_year, region=selected_region, animate=animate)
+
+        with metrics.span('regressions'):
+            fits = load_gni_regressions(dataset.version, df)
+
+        # Every selection is a lookup into the precomputed fits
+        with metrics.span('lookup'):
+            try:
+                group_fits = fits.loc[(selected_pollutant, selected_year, selected_region)]
+            except KeyError:
+                st.error("No data available for the selected criteria.")
+                return
+
+        plot_data(df, fits, group_fits, selected_pollutant, selected_year, selected_region, dataset.version, animate)
+
+        st.link_button(":blue[🔗 Data source: World Bank - GNI per capita, Atlas method]", "https://datahelpdesk.worldbank.org/knowledgebase/articles/906519-world-bank-country-and-lending-groups")
+
+        with metrics.span('statistics'):
+            display_fits(group_fits)
+
+
+def main():
+    # Load data
+    with metrics.span('load_data'):
+        dataset = load_data()
+
+    if dataset.frame.empty:
+        st.error("No data available to display.")
+        return
+
+    st.title(':green[Wealth and Air:] Pollution Levels vs. GNI per Capita')
+
+    st.divider()
+
+    gni_chart()
+
+    with st.expander("👀 UNDERSTANDING WHAT YOU SEE"):
+        st.write("Each bubble is a country, sized by its population. The dashed lines are the trends of each income group, weighted by population so that larger countries count more.")
+        st.write("A :green[negative] change per 1,000 GNI means richer countries in that group tend to breathe cleaner air; the correlation shows how closely the countries follow that trend.")
+
+
+with metrics.page_rerun('gni_vs_air_pollution'):
+    start_refresher()
+
+    main()
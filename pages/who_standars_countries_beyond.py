@@ -3,157 +3,168 @@
 
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import plotly.express as px
-from plotly.subplots import make_subplots
-import plotly.graph_objs as go
-import numpy as np
+
+from utils import metrics
+from utils.client_filter import client_filtering_enabled, who_explorer
+from utils.export import export_controls
+from utils.map_view import who_map
+from utils.page_data import (
+    WHO_YEAR, load_geo_codes, load_store_cube, load_store_options, load_who_cube, load_who_payload, who_exports,
+    who_figure, who_map_values, who_mean_levels, who_selection
+)
+from utils.refresher import start_refresher
+from utils.registry import Dataset, datasets
+from utils.standards import eu_standards, who_standards
+from utils.store import open_store
 
 
 # Function to load data
-@st.cache
 def load_data():
+    # Current snapshot shared by every session; swapped in place by the background refresher
     try:
-        DATA_URL = 'https://raw.githubusercontent.com/JesHP73/climanteinterlense/main/dataset/who_standars_air_quality_countries.csv'
-        data = pd.read_csv(DATA_URL)
-        return data
+        return datasets.get("who_standards")
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return pd.DataFrame()  # Return an empty DataFrame in case of error
-
-
-df_original = load_data()
-
-# Create a copy of the DataFrame for manipulation
-df = df_original.copy()
-
-# WHO Standards
-who_standards = {
-    'PM10': {'annual': 15},
-    'PM2.5': {'annual': 5},
-    'NO2': {'annual': 10}
-}
-
-# EU Standards
-eu_standards = {
-    'PM10': {'annual': 40, '24_hours': 50},
-    'PM2.5': {'annual': 25, 'stage2_annual': 20},
-    'NO2': {'annual': 40, '1_hour': 200}
-}
-
+        return Dataset("who_standards", None, pd.DataFrame())  # Return an empty DataFrame in case of error
 
 
 # Plotting Function
 
-def plot_data(df_mean_levels, who_standards, eu_standards, selected_pollutant):
+def plot_data(df_mean_levels, selected_pollutant, selection, version):
     st.title(f":green[Average] 2023 {selected_pollutant} Emissions By Country (μg/m³)")
     # Making sure the selected pollutant is in the WHO standards dictionary
     if selected_pollutant not in who_standards:
         st.error(f"Selected pollutant {selected_pollutant} does not have a WHO standard defined.")
         return
 
-    # Calculating the difference from the WHO standard and sort
-    standard_who = who_standards[selected_pollutant]['annual']
-    df_filtered = df_mean_levels.assign(difference=lambda x: x['air_pollutant_level'] - standard_who)
-    df_filtered = df_filtered.sort_values('difference', ascending=False)
-
-    # Define a custom color sequence for the regions
-    custom_colors = ['teal', 'crimson', 'forestgreen', 'darkorange', 'goldenrod', 'darkslateblue', 'plum']
-
-    # Updating the Plotly figure to use the sorted data with custom colors
-    fig = px.bar(df_filtered, x='country', y='air_pollutant_level', color='region',
-                 #title=f'Average {selected_pollutant} Emissions by Country in 2023'
-                 labels={'country': 'Country', 'air_pollutant_level': f'Average {selected_pollutant} Level (μg/m³)'},
-                 color_discrete_sequence=custom_colors)
-
-    # Rotating the x-axis labels
-    fig.update_layout(xaxis_tickangle=-45)
-      
-
-    # Setting a fixed y-axis range
-    fig.update_yaxes(autorange=True)
-
-    # Setting the figure size and moving the legend position outside to the right
-    fig.update_layout(
-        height=600,
-        width=1400,
-        legend=dict(
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.05  # This places the legend outside the plot to the right
-        ),
-        margin=dict(r=150) 
-    )
-
-    # Add the EU standard line if it exists for the selected pollutant
-    eu_standard = eu_standards.get(selected_pollutant, {}).get('annual')
-    if eu_standard is not None:
-        # Add a dummy trace for the EU standard to appear in the legend
-        fig.add_trace(
-            go.Scatter(
-                x=[None], 
-                y=[None], 
-                mode='lines', 
-                name=f"EU {selected_pollutant} Annual Standard 2011 (μg/m³)", 
-                line=dict(color='blue', dash='dash')
-            )
-        )
-        # Add the actual EU standard line (without a name parameter)
-        fig.add_hline(y=eu_standard, line_dash='dash', line_color='blue')
-
-    # Add the WHO standard line and a corresponding dummy trace for the legend
-    fig.add_trace(
-        go.Scatter(
-            x=[None],
-            y=[None],
-            mode='lines',
-            name=f"WHO {selected_pollutant} Annual Standard 2021 (μg/m³)",
-            line=dict(color='red', width=2)
-        )
-    )
-    # Add the actual WHO standard line (without a name parameter)
-    fig.add_hline(y=standard_who, line_dash='solid', line_color='red')
-    
-    # Display the figure in Streamlit
-    st.plotly_chart(fig, use_container_width=True)
+    # Reuse the figure built for the same selection and dataset version
+    with metrics.span('figure'):
+        fig = who_figure(df_mean_levels, selected_pollutant, selection, version)
 
+    # Display the figure in Streamlit
+    with metrics.span('plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
 
 
-# User input areas for filtering
-region_options = ['All'] + sorted(df['region'].unique().tolist())
-pollutants_options = sorted(df['air_pollutant'].unique().tolist())
-
-# Sidebar for user input
-selected_region = st.sidebar.multiselect('Select Region', options=region_options, default=['All'])
-selected_pollutant = st.sidebar.selectbox('Select Pollutant', options=pollutants_options)
-
-# Filtering for the selected pollutant and the year 2023
-df_filtered = df[(df['air_pollutant'] == selected_pollutant) & (df['year'] == 2023)]
-
-# Apply the selected region filter if not 'All'
-if 'All' not in selected_region:
-    df_filtered = df_filtered[df_filtered['region'].isin(selected_region)]
-
-# Exclude Türkiye from the dataset
-df_filtered = df_filtered[df_filtered['country'] != 'Turkiye']
-
-# Ensure the air pollutant level is a numeric type
-df_filtered['air_pollutant_level'] = pd.to_numeric(df_filtered['air_pollutant_level'], errors='coerce')
+# Map view: the outlines stay cached in the browser, so a rerun only sends
+# the selected pollutant's value per country
+def plot_map(df_mean_levels, geo_codes, selected_pollutant):
+    st.title(f":green[Average] 2023 {selected_pollutant} Emissions By Country (μg/m³)")
+    if selected_pollutant not in who_standards:
+        st.error(f"Selected pollutant {selected_pollutant} does not have a WHO standard defined.")
+        return
 
-# Group by both country and region, then calculate the mean air pollution level
-df_mean_levels = df_filtered.groupby(['country', 'region'])['air_pollutant_level'].mean().reset_index()
+    with metrics.span('map_values'):
+        values = who_map_values(df_mean_levels, geo_codes)
 
-standard = who_standards[selected_pollutant]['annual']
-df_mean_levels['difference'] = df_mean_levels['air_pollutant_level'] - standard
+    with metrics.span('map'):
+        who_map(
+            values,
+            selected_pollutant,
+            who_standards[selected_pollutant]['annual'],
+            eu_standards.get(selected_pollutant, {}).get('annual')
+        )
 
-df_mean_levels = df_mean_levels.sort_values('difference', ascending=False)
 
-if df_mean_levels.empty:
-    st.error('No data available for the selected filters.')
-else:
-    plot_data(df_mean_levels, who_standards, eu_standards, selected_pollutant)
+# Chart fragment: a filter change reruns only this function, not the static
+# explanations and population sections below
+@st.fragment
+def who_chart():
+    with metrics.rerun_scope('who_standards_countries'):
+        with metrics.span('load_data'):
+            # Once built, the partitioned store replaces the in-memory dataset so
+            # multi-year archives never have to fit in memory
+            store = open_store("who_standards")
+            dataset = load_data() if store is None else None
+
+        # User input areas for filtering
+        if store is None:
+            df = dataset.frame
+            version = dataset.version
+            region_options = ['All'] + sorted(df['region'].unique().tolist())
+            pollutants_options = sorted(df['air_pollutant'].unique().tolist())
+        else:
+            version = store.version
+            store_regions, pollutants_options = load_store_options(version, WHO_YEAR)
+            region_options = ['All'] + store_regions
+
+        # Filters live inside the fragment (fragments cannot own sidebar widgets)
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            selected_region = st.multiselect('Select Region', options=region_options, default=['All'])
+        with col2:
+            selected_pollutant = st.selectbox('Select Pollutant', options=pollutants_options)
+        view = st.radio('View', ['Bar chart', 'Map'], horizontal=True)
+
+        metrics.set_selection(region=selected_region, pollutant=selected_pollutant, view=view)
+
+        # Slice the precomputed cube for the selected pollutant, the year 2023 and the selected regions
+        with metrics.span('cube'):
+            if store is None:
+                cube = load_who_cube(version, df)
+            else:
+                cube = load_store_cube(version, WHO_YEAR, selected_pollutant)
+        regions = None if 'All' in selected_region else selected_region
+
+        with metrics.span('filter'):
+            # Excludes Türkiye from the dataset
+            df_mean_levels = who_mean_levels(cube, selected_pollutant, regions)
+
+        if df_mean_levels.empty:
+            st.error('No data available for the selected filters.')
+        elif view == 'Map':
+            geo_codes = load_geo_codes(version, df) if store is None else load_geo_codes(version)
+            plot_map(df_mean_levels, geo_codes, selected_pollutant)
+        else:
+            plot_data(df_mean_levels, selected_pollutant, who_selection(regions, selected_pollutant), version)
+
+        if not df_mean_levels.empty:
+            # Exports are only encoded when asked for; the source rows stream from the store when it exists
+            with metrics.span('export'):
+                exports = who_exports(
+                    df_mean_levels, selected_pollutant, regions,
+                    data=df if store is None else None, store=store
+                )
+                export_controls(
+                    'who_standards', version, who_selection(regions, selected_pollutant), exports, key='who_export'
+                )
+
+
+# Client-side chart: the aggregate of every pollutant and region is sent once,
+# then filtering, sorting and the reference lines run in the browser
+def who_client_chart():
+    with metrics.span('load_data'):
+        store = open_store("who_standards")
+        dataset = load_data() if store is None else None
+
+    with metrics.span('cube'):
+        if store is None:
+            version = dataset.version
+            cube = load_who_cube(version, dataset.frame)
+        else:
+            version = store.version
+            _, pollutants = load_store_options(version, WHO_YEAR)
+            cubes = [load_store_cube(version, WHO_YEAR, pollutant) for pollutant in pollutants]
+            cube = pd.concat(cubes) if cubes else pd.DataFrame()
+
+    with metrics.span('payload'):
+        payload = load_who_payload(version, cube)
+
+    if not payload['pollutants']:
+        st.error('No data available for the selected filters.')
+    else:
+        with metrics.span('component'):
+            who_explorer(payload)
+
+
+# The sections below the chart are static text, outside the rerun record
+with metrics.page_rerun('who_standards_countries'):
+    start_refresher()
+
+    if client_filtering_enabled():
+        who_client_chart()
+    else:
+        who_chart()
 
 st.link_button(":blue[🔗 Data source: EEA, European Enviroment Agency.]", "https://www.eea.europa.eu/en/datahub?size=n_10_n&filters%5B0%5D%5Bfield%5D=topic&filters%5B0%5D%5Bvalues%5D%5B0%5D=Air%20pollution&filters%5B0%5D%5Btype%5D=any&filters%5B1%5D%5Bfield%5D=issued.date&filters%5B1%5D%5Bvalues%5D%5B0%5D=All%20time&filters%5B1%5D%5Btype%5D=any&sort-field=issued.date&sort-direction=desc")
 
@@ -0,0 +1,44 @@
+# coding: utf-8
+
+"""Shared test setup.
+
+The tests import ``utils`` from the repository root. Everything the app
+writes (Parquet cache, stores, the shared SQLite cache, exports) goes to a
+temporary directory set up before ``utils.config`` is first imported, so a
+test run never touches the caches of an app running from this checkout.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+_TMP_DIR = tempfile.mkdtemp(prefix="climate-tests-")
+for variable in [variable for variable in os.environ if variable.startswith("CLIMATE_")]:
+    del os.environ[variable]
+os.environ["CLIMATE_CACHE_DIR"] = os.path.join(_TMP_DIR, "cache")
+os.environ["CLIMATE_EXPORT_DIR"] = os.path.join(_TMP_DIR, "static", "exports")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def app_dirs(tmp_path, monkeypatch):
+    """Point every directory the app reads or writes at ``tmp_path`` for one test."""
+    from utils import config
+
+    for name in ("DATASET_DIR", "CACHE_DIR", "REFRESHED_DIR", "STORE_DIR", "EXPORT_DIR"):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setattr(config, name, path)
+    return config
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+"""Chunked, split exports against writing the whole frame with pandas."""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from utils.export import export_file, export_name, filtered_chunks, frame_chunks
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    size = 20_000
+    return pd.DataFrame({
+        "country": pd.Categorical(rng.choice(["Spain", "Germany", "Poland"], size)),
+        "year": rng.integers(2000, 2024, size).astype("int16"),
+        "air_pollutant_level": rng.gamma(2.0, 8.0, size).astype("float32"),
+        "note": rng.choice(["a", "b, with comma", 'c "quoted"'], size),
+    })
+
+
+@pytest.fixture
+def small_parts(app_dirs, monkeypatch):
+    monkeypatch.setattr(app_dirs, "EXPORT_PART_BYTES", 100_000)
+    return app_dirs
+
+
+def test_csv_parts_add_up_to_to_csv(small_parts, frame):
+    parts = export_file("test", "v1", ("selection",), "CSV", lambda: frame_chunks(frame, 1_500))
+
+    assert len(parts) > 1
+    assert all(size == path.stat().st_size for path, size in parts)
+    # Every part is a CSV file with the header; together they hold the frame's rows in order
+    contents = [path.read_bytes() for path, _ in parts]
+    header, *_ = frame.to_csv(index=False).encode("utf-8").partition(b"\n")
+    assert all(content.startswith(header + b"\n") for content in contents)
+    combined = pd.concat([pd.read_csv(io.BytesIO(content)) for content in contents], ignore_index=True)
+    expected = pd.read_csv(io.BytesIO(frame.to_csv(index=False).encode("utf-8")))
+    pd.testing.assert_frame_equal(combined, expected)
+
+
+def test_parquet_parts_add_up_to_the_frame(small_parts, frame):
+    parts = export_file("test", "v1", ("selection",), "Parquet", lambda: frame_chunks(frame, 1_500))
+
+    assert len(parts) > 1
+    combined = pd.concat([pq.read_table(path).to_pandas() for path, _ in parts], ignore_index=True)
+    pd.testing.assert_frame_equal(combined, frame)
+
+
+def test_small_export_is_one_file(app_dirs, frame):
+    mask = lambda chunk: chunk["country"] == "Spain"
+    parts = export_file("test", "v1", ("spain",), "CSV", lambda: filtered_chunks(frame, mask, ["country", "year"], 1_500))
+
+    assert len(parts) == 1
+    expected = frame.loc[mask(frame), ["country", "year"]].to_csv(index=False).encode("utf-8")
+    assert parts[0][0].read_bytes() == expected
+
+
+def test_existing_export_is_reused_and_pruned_one_regenerated(small_parts, frame):
+    calls = []
+
+    def chunks():
+        calls.append(1)
+        return frame_chunks(frame, 1_500)
+
+    first = export_file("test", "v1", ("selection",), "CSV", chunks)
+    assert export_file("test", "v1", ("selection",), "CSV", chunks) == first
+    assert len(calls) == 1
+
+    # Another session's prune removed it: it is written again
+    for path, _ in first:
+        path.unlink()
+    (small_parts.EXPORT_DIR / export_name("test", "v1", ("selection",), "CSV")).rmdir()
+    assert export_file("test", "v1", ("selection",), "CSV", chunks) == first
+    assert len(calls) == 2
+
+
+def test_only_the_newest_exports_are_kept(small_parts, monkeypatch, frame):
+    monkeypatch.setattr(small_parts, "EXPORT_MAX_FILES", 2)
+    for age, selection in enumerate(("a", "b", "c"), start=1):
+        export_file("test", "v1", (selection,), "CSV", lambda: frame_chunks(frame.iloc[:10], 1_500))
+        # Distinct ages, whatever the file system's timestamp granularity
+        os.utime(small_parts.EXPORT_DIR / export_name("test", "v1", (selection,), "CSV"), (age, age))
+
+    assert sorted(path.name for path in small_parts.EXPORT_DIR.iterdir()) == sorted(
+        export_name("test", "v1", (selection,), "CSV") for selection in ("b", "c")
+    )
@@ -0,0 +1,92 @@
+# coding: utf-8
+
+"""Chunked ingestion against aggregating the whole raw file at once with pandas."""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.ingest import RAW_COLUMNS, STATION_COLUMNS, Progress, aggregate_files, load_stations, to_dataset
+from utils.standards import LIMITS
+
+COUNTRIES = pd.DataFrame(
+    {"country": ["Spain", "Germany", "Poland"], "region": ["Southern Europe", "Western Europe", "Eastern Europe"]},
+    index=pd.Index(["ES", "DE", "PL"], name="geo_code"),
+)
+
+
+@pytest.fixture
+def raw_files(tmp_path):
+    rng = np.random.default_rng(0)
+    stations = pd.DataFrame({
+        STATION_COLUMNS["station"]: [f"STA{i}" for i in range(12)],
+        # "FR" has no country in COUNTRIES, so its rows are dropped
+        STATION_COLUMNS["geo_code"]: ["ES", "ES", "DE", "DE", "DE", "PL", "PL", "ES", "DE", "PL", "FR", "ES"],
+        STATION_COLUMNS["station_type"]: ["traffic", "background", "industrial"] * 4,
+    })
+    stations_path = tmp_path / "stations.csv"
+    stations.to_csv(stations_path, index=False)
+
+    paths = []
+    for part in range(2):
+        size = 3_000
+        raw = pd.DataFrame({
+            # STA99 is missing from the station metadata
+            RAW_COLUMNS["station"]: rng.choice([f"STA{i}" for i in range(12)] + ["STA99"], size),
+            RAW_COLUMNS["pollutant"]: rng.choice(["PM10", "PM2.5", "NO2", "O3"], size),
+            RAW_COLUMNS["value"]: np.where(rng.random(size) < 0.05, np.nan, rng.gamma(2.0, 8.0, size).round(3)),
+            RAW_COLUMNS["unit"]: rng.choice(["ug.m-3", "µg/m3"], size),
+            RAW_COLUMNS["time"]: [f"{year}-03-01 00:00:00+01:00" for year in rng.choice([2021, 2022, 2023], size)],
+            RAW_COLUMNS["validity"]: rng.choice([1, 1, 1, 2, -1, 0], size),
+        })
+        path = tmp_path / f"raw{part}.csv"
+        raw.to_csv(path, index=False)
+        paths.append(path)
+    return paths, stations_path
+
+
+def reference(paths, stations_path, with_station_type):
+    """The whole raw data in memory, aggregated in one groupby."""
+    raw = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    stations = pd.read_csv(stations_path).rename(columns={v: k for k, v in STATION_COLUMNS.items()})
+    stations["station_type"] = stations["station_type"].str.title()
+    raw = raw.rename(columns={v: k for k, v in RAW_COLUMNS.items()}).merge(stations, on="station")
+    raw = raw[(raw["validity"] > 0) & raw["pollutant"].isin(LIMITS.index) & raw["value"].notna()]
+    raw = raw.assign(unit=raw["unit"].replace({"ug.m-3": "ug/m3", "µg/m3": "ug/m3"}), year=raw["time"].str[:4].astype(int))
+    raw = raw[raw["geo_code"].isin(COUNTRIES.index)]
+
+    keys = ["geo_code", "pollutant", "unit", "year"] + (["station_type"] if with_station_type else [])
+    return raw.groupby(keys)["value"].agg(["mean", "count", "max"]).reset_index()
+
+
+@pytest.mark.parametrize("with_station_type", [True, False])
+def test_chunked_aggregate_matches_one_groupby(raw_files, with_station_type):
+    paths, stations_path = raw_files
+    # Chunks much smaller than a file, so groups span chunks and files
+    progress = Progress(0, stream=io.StringIO())
+    running = aggregate_files(paths, load_stations(stations_path), chunk_rows=257, progress=progress)
+    data = to_dataset(running, COUNTRIES, with_station_type=with_station_type)
+    expected = reference(paths, stations_path, with_station_type)
+
+    keys = ["geo_code", "air_pollutant", "year"] + (["air_qual_stat_type"] if with_station_type else [])
+    data = data.sort_values(keys, ignore_index=True)
+    expected = expected.sort_values(
+        ["geo_code", "pollutant", "year"] + (["station_type"] if with_station_type else []), ignore_index=True
+    )
+
+    assert len(data) == len(expected)
+    np.testing.assert_array_equal(data["geo_code"], expected["geo_code"])
+    np.testing.assert_array_equal(data["air_pollutant"], expected["pollutant"])
+    np.testing.assert_array_equal(data["year"], expected["year"])
+    if with_station_type:
+        np.testing.assert_array_equal(data["air_qual_stat_type"], expected["station_type"])
+    assert (data["unit_air_poll_lvl"] == "ug/m3").all()
+    np.testing.assert_allclose(data["air_pollutant_level"], expected["mean"], rtol=1e-12)
+    np.testing.assert_array_equal(data["measurement_count"], expected["count"])
+    np.testing.assert_allclose(data["max_air_pollutant_level"], expected["max"])
+    np.testing.assert_array_equal(data["country"], COUNTRIES.loc[data["geo_code"], "country"])
+
+    limit = LIMITS["who_2021_annual"].reindex(data["air_pollutant"]).to_numpy()
+    np.testing.assert_allclose(data["exceedance_amount"], np.maximum(expected["mean"] - limit, 0), rtol=1e-12)
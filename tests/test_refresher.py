@@ -0,0 +1,129 @@
+# coding: utf-8
+
+"""Background refresh against a local HTTP file server standing in for the remote source."""
+
+import functools
+import hashlib
+import io
+import shutil
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from utils.data_loader import DATASETS
+from utils.figure_cache import figure_cache
+from utils.refresher import Refresher
+from utils.registry import datasets
+
+NAME = "air_quality_gni"
+
+
+class ETagHandler(SimpleHTTPRequestHandler):
+    """Static files with a content ETag, answering 304 to a matching If-None-Match."""
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        try:
+            with open(path, "rb") as handle:
+                self.etag = '"%s"' % hashlib.sha256(handle.read()).hexdigest()
+        except OSError:
+            self.etag = None
+        if self.etag is not None and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        super().do_GET()
+
+    def end_headers(self):
+        if getattr(self, "etag", None):
+            self.send_header("ETag", self.etag)
+        super().end_headers()
+
+    def log_request(self, code="-", size="-"):
+        self.server.statuses.append(int(code))
+
+
+@pytest.fixture
+def server(tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ETagHandler, directory=str(served)))
+    httpd.statuses = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, served, f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def loaded(app_dirs, server):
+    """The dataset seeded from the repository copy, loaded, and served unchanged."""
+    shutil.copy(app_dirs.ROOT_DIR / "dataset" / DATASETS[NAME], app_dirs.DATASET_DIR)
+    shutil.copy(app_dirs.ROOT_DIR / "dataset" / DATASETS[NAME], server[1])
+    datasets.clear()
+    figure_cache.clear()
+    yield datasets.get(NAME)
+    datasets.clear()
+    figure_cache.clear()
+
+
+def serve(served, frame):
+    (served / DATASETS[NAME]).write_bytes(frame.to_csv(index=False).encode("utf-8"))
+
+
+def test_unchanged_source_does_nothing(app_dirs, server, loaded):
+    httpd, _, url = server
+    refresher = Refresher(url, interval=3600)
+
+    assert refresher.refresh(NAME) is None
+    # The second poll is conditional and answered 304 Not Modified
+    assert refresher.refresh(NAME) is None
+
+    assert httpd.statuses == [200, 304]
+    assert datasets.loaded(NAME) is loaded
+    assert list(app_dirs.REFRESHED_DIR.iterdir()) == []
+
+
+def test_changed_source_swaps_the_snapshot(app_dirs, server, loaded):
+    _, served, url = server
+    seed = (app_dirs.DATASET_DIR / DATASETS[NAME]).read_bytes()
+    key = ("gni_vs_air_pollution", (), loaded.version)
+    figure_cache.put(key, None, payload='{"data": [], "layout": {}}')
+
+    changed = pd.read_csv(io.BytesIO(seed)).iloc[:-10]
+    serve(served, changed)
+    version = Refresher(url, interval=3600).refresh(NAME)
+
+    current = datasets.loaded(NAME)
+    assert version is not None and version != loaded.version
+    assert current.version == version
+    assert len(current.frame) == len(changed)
+    assert figure_cache.get(key) is None
+    # The seed copy is left alone; the new version is written next to the caches
+    assert (app_dirs.DATASET_DIR / DATASETS[NAME]).read_bytes() == seed
+    assert [path.name for path in app_dirs.REFRESHED_DIR.iterdir()] == [f"air_quality_vs_gni_agg-{version}.csv"]
+
+
+def test_invalid_source_keeps_the_snapshot(app_dirs, server, loaded, caplog):
+    _, served, url = server
+    broken = loaded.frame.astype({"population": "object"})
+    broken.loc[broken.index[0], "population"] = "not a number"
+    serve(served, broken)
+
+    Refresher(url, interval=3600).refresh_all()
+
+    assert datasets.loaded(NAME) is loaded
+    assert list(app_dirs.REFRESHED_DIR.iterdir()) == []
+    assert f"Refreshing dataset {NAME} failed" in caplog.text
+
+
+def test_datasets_not_in_use_are_not_fetched(app_dirs, server, loaded):
+    httpd, _, url = server
+
+    assert Refresher(url, interval=3600).refresh("pollution_by_industry") is None
+
+    assert httpd.statuses == []
+    assert datasets.loaded("pollution_by_industry") is None
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+"""Batched weighted regressions against one fit per pandas group."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.regression import MIN_POINTS, gni_regressions, weighted_regressions
+
+
+def fit_group(group):
+    """Weighted least squares of one group, the way it was fitted before batching."""
+    group = group.dropna(subset=["x", "y", "w"])
+    x, y, w = (group[column].to_numpy(dtype="float64") for column in ("x", "y", "w"))
+    result = {"n": len(group), "total_weight": w.sum(), "slope": np.nan, "intercept": np.nan, "r": np.nan}
+    if len(group) < MIN_POINTS or np.ptp(x) == 0:
+        return pd.Series(result)
+    mean_x, mean_y = np.average(x, weights=w), np.average(y, weights=w)
+    var_x = np.average((x - mean_x) ** 2, weights=w)
+    var_y = np.average((y - mean_y) ** 2, weights=w)
+    cov = np.average((x - mean_x) * (y - mean_y), weights=w)
+    result["slope"] = cov / var_x
+    result["intercept"] = mean_y - result["slope"] * mean_x
+    if np.ptp(y) > 0:
+        result["r"] = cov / np.sqrt(var_x * var_y)
+    return pd.Series(result)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    frames = []
+    for group in range(20):
+        size = rng.integers(1, 30)
+        x = rng.uniform(1_000, 80_000, size)
+        frames.append(pd.DataFrame({
+            "group": f"g{group}",
+            "x": x,
+            "y": 30 - x * rng.uniform(0, 1e-4) + rng.normal(0, 2, size),
+            "w": rng.uniform(1e5, 1e8, size),
+        }))
+    frames.append(pd.DataFrame({"group": "with_missing", "x": [1_000.0, np.nan, 3_000.0, 4_000.0, 5_000.0],
+                                "y": [10.0, 11.0, np.nan, 14.0, 16.0], "w": [1.0, 2.0, 3.0, np.nan, 5.0]}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_matches_per_group_fits(data):
+    batched = weighted_regressions(data, ["group"], x="x", y="y", weight="w")
+    expected = data.groupby("group").apply(fit_group)
+
+    pd.testing.assert_series_equal(batched["n"], expected["n"].astype(batched["n"].dtype), check_names=False)
+    for column in ("total_weight", "slope", "intercept", "r"):
+        pd.testing.assert_series_equal(batched[column], expected[column], check_names=False, rtol=1e-9)
+    np.testing.assert_allclose(batched["r2"], expected["r"] ** 2, rtol=1e-9)
+
+
+def test_constant_groups_have_no_fit():
+    # E[x²] - E[x]² of these groups cancels to a tiny nonzero variance,
+    # which gave a slope of 0 and r ≈ -3e-8 instead of NaN
+    weights = [2.24e7, 4.7e7, 5.69e7, 6.93e7]
+    data = pd.DataFrame({
+        "group": ["other"] * 3 + ["constant_y"] * 4 + ["constant_x"] * 4,
+        "x": [1_000.0, 2_000.0, 3_000.0, 85_000.0, 17_000.0, 59_000.0, 17_000.0] + [110_924.0] * 4,
+        "y": [5.0, 6.0, 8.0] + [70.4] * 4 + [57.6, 16.1, 29.7, 53.6],
+        "w": [1e6, 2e6, 3e6] + weights + weights,
+    })
+
+    batched = weighted_regressions(data, ["group"], x="x", y="y", weight="w")
+
+    assert np.isnan(batched.loc["constant_x", ["slope", "intercept", "r", "r2"]]).all()
+    # A constant level is fitted by a flat line, but has no correlation
+    assert batched.loc["constant_y", "slope"] == pytest.approx(0, abs=1e-12)
+    assert batched.loc["constant_y", "intercept"] == pytest.approx(70.4)
+    assert np.isnan(batched.loc["constant_y", ["r", "r2"]]).all()
+
+
+def test_gni_regressions_include_all_regions():
+    data = pd.DataFrame({
+        "air_pollutant": "PM2.5",
+        "year": 2020,
+        "region": ["North", "North", "North", "South", "South", "South"],
+        "ig_label": "H",
+        "GNI_per_capita": [10_000.0, 20_000.0, 30_000.0, 40_000.0, 50_000.0, 60_000.0],
+        "air_pollutant_level": [20.0, 18.0, 16.0, 14.0, 12.0, 10.0],
+        "population": [1e6, 2e6, 3e6, 4e6, 5e6, 6e6],
+    })
+
+    fits = gni_regressions(data)
+
+    assert fits.loc[("PM2.5", 2020, "All", "H"), "slope"] == pytest.approx(-2e-4)
+    assert fits.loc[("PM2.5", 2020, "North", "H"), "r"] == pytest.approx(-1)
+    assert fits.loc[("PM2.5", 2020, "All", "H"), "n"] == 6
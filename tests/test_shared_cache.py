@@ -0,0 +1,95 @@
+# coding: utf-8
+
+"""SQLite shared cache against an in-memory LRU with the same byte budget."""
+
+import itertools
+import random
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from utils import shared_cache as shared_cache_module
+from utils.shared_cache import SharedCache, make_key
+
+
+class ReferenceLRU:
+    """The eviction the cache implements, as a plain ordered dict."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        while sum(len(stored) for stored in self.entries.values()) > self.max_bytes:
+            self.entries.popitem(last=False)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing access times, so no two accesses tie
+    ticks = itertools.count(1)
+    monkeypatch.setattr(shared_cache_module, "time", SimpleNamespace(time=lambda: float(next(ticks)), monotonic=time.monotonic))
+
+
+def test_eviction_matches_reference_lru(tmp_path, clock):
+    cache = SharedCache(tmp_path / "results.sqlite", max_bytes=1_000)
+    reference = ReferenceLRU(1_000)
+    rng = random.Random(0)
+    keys = [make_key("test", i) for i in range(30)]
+
+    for _ in range(2_000):
+        key = rng.choice(keys)
+        if rng.random() < 0.5:
+            assert cache.get(key) == reference.get(key)
+        else:
+            value = bytes([rng.randrange(256)]) * rng.choice([10, 50, 120, 400, 1_200])
+            cache.put(key, value)
+            reference.put(key, value)
+
+    stored = cache._connection().execute("SELECT key, size FROM results").fetchall()
+    assert {key for key, _ in stored} == set(reference.entries)
+    assert sum(size for _, size in stored) <= 1_000
+
+
+def test_results_are_shared_between_handles(tmp_path):
+    # Two handles on one file, as two server processes would open it
+    first = SharedCache(tmp_path / "results.sqlite")
+    second = SharedCache(tmp_path / "results.sqlite")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"rows": [1, 2, 3]}
+
+    assert first.get_or_compute("key", compute) == {"rows": [1, 2, 3]}
+    assert second.get_or_compute("key", compute) == {"rows": [1, 2, 3]}
+    assert len(calls) == 1
+
+    second.clear()
+    assert first.get("key") is None
+
+
+def test_keys_depend_on_every_part():
+    assert make_key("figure", 1, "page", (), "v1") == make_key("figure", 1, "page", (), "v1")
+    assert make_key("figure", 1, "page", (), "v1") != make_key("figure", 2, "page", (), "v1")
+    assert make_key("figure", 1, "page", (), "v1") != make_key("figure", 1, "page", (), "v2")
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = SharedCache(tmp_path / "results.sqlite", max_bytes=0)
+    cache.put("key", b"value")
+
+    assert cache.get("key") is None
+    assert not (tmp_path / "results.sqlite").exists()
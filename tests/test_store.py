@@ -0,0 +1,105 @@
+# coding: utf-8
+
+"""Partitioned store scans against filtering the typed frame with pandas."""
+
+import pandas as pd
+import pytest
+
+from utils import config
+from utils import store as store_module
+from utils.data_loader import DATASETS
+from utils.schema import apply_schema
+from utils.store import CURRENT_FILE, build_store, open_store, store_path, write_store
+
+NAME = "who_standards"
+SEED = config.DATASET_DIR / DATASETS[NAME]
+
+
+@pytest.fixture
+def frame():
+    return apply_schema(pd.read_csv(SEED), NAME)
+
+
+@pytest.fixture
+def store(app_dirs, monkeypatch, frame):
+    (app_dirs.DATASET_DIR / DATASETS[NAME]).write_bytes(SEED.read_bytes())
+    # Several chunks, so categories and dtypes have to agree across them
+    monkeypatch.setattr(store_module, "CHUNK_ROWS", 2_000)
+    return build_store(NAME)
+
+
+def comparable(frame):
+    """Rows as plain values in a fixed order, whatever the dtypes and row order."""
+    frame = frame.astype({column: str for column in frame.select_dtypes("category").columns})
+    return frame.sort_values(list(frame.columns), ignore_index=True)
+
+
+def expected(frame, columns=None, year=None, pollutants=None, regions=None):
+    mask = pd.Series(True, index=frame.index)
+    if year is not None:
+        mask &= frame["year"] == year
+    if pollutants is not None:
+        mask &= frame["air_pollutant"].isin(pollutants)
+    if regions is not None:
+        mask &= frame["region"].isin(regions)
+    return frame.loc[mask, columns or list(frame.columns)]
+
+
+FILTERS = [
+    {},
+    {"year": 2023},
+    {"year": 2023, "pollutants": ["PM2.5"]},
+    {"pollutants": ["NO2", "PM10"], "regions": ["Southern Europe", "Western Europe"]},
+    {"year": 2023, "pollutants": ["NO2"], "regions": ["Northern Europe"], "columns": ["country", "air_pollutant_level"]},
+    {"year": 1900},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_scan_matches_pandas_filter(store, frame, filters):
+    filters = dict(filters)
+    columns = filters.pop("columns", None)
+    scanned = store.scan(columns=columns, **filters)
+    reference = expected(frame, columns, **filters)
+
+    # Partition columns come back after the others
+    assert sorted(scanned.columns) == sorted(reference.columns)
+    pd.testing.assert_frame_equal(comparable(scanned[list(reference.columns)]), comparable(reference), check_dtype=False)
+
+
+def test_dimensions_come_back_as_sorted_categoricals(store, frame):
+    scanned = store.scan(year=2023)
+
+    for column in ("country", "region", "air_pollutant", "geo_code"):
+        assert isinstance(scanned[column].dtype, pd.CategoricalDtype)
+        assert list(scanned[column].cat.categories) == sorted(scanned[column].cat.categories)
+    assert scanned["year"].dtype == frame["year"].dtype
+    assert scanned["air_pollutant_level"].dtype == frame["air_pollutant_level"].dtype
+
+
+def test_scan_batches_add_up_to_scan(store):
+    batches = list(store.scan_batches(year=2023, batch_rows=500))
+
+    assert max(len(batch) for batch in batches) <= 500
+    pd.testing.assert_frame_equal(
+        comparable(pd.concat(batches).astype(str)), comparable(store.scan(year=2023).astype(str))
+    )
+
+
+def test_partition_values_and_distinct(store, frame):
+    assert store.partition_values("air_pollutant", year=2023) == sorted(
+        frame.loc[frame["year"] == 2023, "air_pollutant"].astype(str).unique()
+    )
+    assert store.distinct("region") == sorted(frame["region"].astype(str).unique())
+
+
+def test_new_versions_replace_the_pointer_and_prune_old_ones(store, frame):
+    root = store_path(NAME)
+    for version in ("second", "third"):
+        write_store(frame.iloc[:100], root, version)
+
+    assert (root / CURRENT_FILE).read_text() == "third"
+    assert open_store(NAME).version == "third"
+    assert len(open_store(NAME).scan()) == 100
+    # The version before the current one stays for readers that opened it
+    assert sorted(path.name for path in root.iterdir() if path.is_dir()) == ["second", "third"]
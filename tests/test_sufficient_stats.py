@@ -0,0 +1,81 @@
+# coding: utf-8
+
+"""Sufficient statistics against filtering and grouping the full frame with pandas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import config
+from utils.data_loader import DATASETS
+from utils.schema import apply_schema
+from utils.sufficient_stats import SufficientStats
+
+MEASURE = "total_death_attributed_sex_standarized"
+INCOME_GROUPS = ["LM", "UM", "H"]
+
+
+@pytest.fixture(scope="module")
+def data():
+    return apply_schema(pd.read_csv(config.DATASET_DIR / DATASETS["global_burden"]), "global_burden")
+
+
+@pytest.fixture(scope="module")
+def stats(data):
+    return SufficientStats(data, [MEASURE, "people_affected"])
+
+
+def selections(data):
+    regions = sorted(data["region"].astype(str).unique())
+    countries = sorted(data["country"].astype(str).unique())
+    yield None, None, INCOME_GROUPS
+    yield regions[:1], None, INCOME_GROUPS
+    yield None, countries[:3], ["LM", "H"]
+    yield regions[-1:], countries, ["H"]
+    yield regions, countries[5:9], INCOME_GROUPS
+
+
+def filtered(data, regions, countries, labels):
+    mask = data["ig_label"].isin(labels)
+    if regions is not None:
+        mask &= data["region"].isin(regions)
+    if countries is not None:
+        mask &= data["country"].isin(countries)
+    return data[mask]
+
+
+def test_means_by_year_label_match_groupby(data, stats):
+    for regions, countries, labels in selections(data):
+        expected = (
+            filtered(data, regions, countries, labels)
+            .astype({"ig_label": str})
+            .groupby(["year", "ig_label"], as_index=False)[MEASURE].mean()
+            .dropna()
+        )
+        positions = stats.country_positions(regions, countries)
+        means = stats.means_by_year_label(positions, labels, MEASURE)
+        means = means.sort_values(["year", "ig_label"], ignore_index=True)
+
+        np.testing.assert_array_equal(means["year"], expected["year"])
+        np.testing.assert_array_equal(means["ig_label"], expected["ig_label"])
+        np.testing.assert_allclose(means[MEASURE], expected[MEASURE], rtol=1e-6)
+
+
+def test_latest_means_match_the_latest_year(data, stats):
+    for regions, countries, labels in selections(data):
+        rows = filtered(data, regions, countries, labels)
+        latest = rows.dropna(subset=[MEASURE])["year"].max()
+        year, means = stats.latest_means(stats.country_positions(regions, countries), labels)
+
+        assert year == latest
+        latest_rows = rows[rows["year"] == latest]
+        assert means[MEASURE] == pytest.approx(latest_rows[MEASURE].mean(), rel=1e-6)
+        assert means["people_affected"] == pytest.approx(latest_rows["people_affected"].mean(), rel=1e-9)
+
+
+def test_empty_selection_has_no_data(stats):
+    positions = stats.country_positions(countries=["Nowhere"])
+
+    assert not stats.has_data(positions, INCOME_GROUPS)
+    assert stats.latest_means(positions, INCOME_GROUPS) == (None, {})
+    assert stats.means_by_year_label(positions, INCOME_GROUPS, MEASURE).empty
@@ -0,0 +1,48 @@
+# coding: utf-8
+
+"""Precomputed aggregates that let the pages answer filters with a slice."""
+
+import pandas as pd
+
+from utils.standards import MARGIN_COLUMNS
+
+# Bump when the cube's layout or measures change; shared-cache keys include it
+CUBE_VERSION = 1
+
+# Dimensions and measures of the WHO-standards cube, in index order; the mean
+# margin against each standard equals the mean level minus that limit
+WHO_CUBE_KEYS = ["air_pollutant", "year", "region", "country"]
+WHO_CUBE_MEASURES = ["air_pollutant_level", "exceedance_amount"] + MARGIN_COLUMNS
+
+
+def build_who_cube(data):
+    """Mean pollutant level, exceedance and margins by (pollutant, year, region, country).
+
+    The result is indexed by ``WHO_CUBE_KEYS`` and lexsorted, so a
+    (pollutant, year) selection is a direct index lookup.
+    """
+    cube = data.groupby(WHO_CUBE_KEYS, observed=True, sort=True)[WHO_CUBE_MEASURES].mean()
+    return cube.sort_index()
+
+
+def slice_who_cube(cube, pollutant, year, regions=None, exclude_countries=()):
+    """Per-country rows of the cube for one pollutant and year.
+
+    ``regions`` of ``None`` keeps every region. Returns a flat frame with
+    ``country``, ``region`` and the cube measures; the dimension columns are
+    plain strings so charts only see the categories actually selected.
+    """
+    columns = ["country", "region"] + WHO_CUBE_MEASURES
+    if cube.empty:
+        return pd.DataFrame(columns=columns)
+    try:
+        selection = cube.xs((pollutant, year), level=["air_pollutant", "year"])
+    except KeyError:
+        return pd.DataFrame(columns=columns)
+
+    if regions is not None:
+        selection = selection[selection.index.get_level_values("region").isin(regions)]
+    if exclude_countries:
+        selection = selection[~selection.index.get_level_values("country").isin(exclude_countries)]
+
+    return selection.reset_index()[columns].astype({"country": str, "region": str})
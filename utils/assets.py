@@ -0,0 +1,98 @@
+# coding: utf-8
+
+"""Pre-encoded, resized variants of the static images.
+
+Each image is resized to a few widths and recompressed as progressive JPEG
+once, cached on disk by source hash and kept in memory. ``st.image`` passes
+JPEG bytes that already have the requested width through unchanged, and the
+media file manager names them by content hash, so the image URL stays the
+same across reruns and the browser does not download it again.
+
+WebP variants are not produced: ``st.image`` only sends JPEG, PNG or GIF and
+re-encodes any other image on every call, which is the cost this module
+avoids.
+
+Run ``python -m utils.assets`` at build time to pre-generate every variant.
+"""
+
+import io
+import os
+import threading
+from pathlib import Path
+
+from utils import config
+from utils.data_loader import file_hash
+from utils.lazy_imports import lazy_import
+
+Image = lazy_import("PIL.Image")
+
+IMAGE_WIDTHS = (480, 700, 1024)
+JPEG_QUALITY = 82
+
+ASSETS_CACHE_DIR = config.CACHE_DIR / "assets"
+
+# (source path, width) -> JPEG bytes, shared by every session
+_variants = {}
+_lock = threading.Lock()
+
+
+def _resolve(source):
+    source = Path(source)
+    return source if source.is_absolute() else config.ROOT_DIR / source
+
+
+def encode_variant(source, width, quality=JPEG_QUALITY):
+    """Resize ``source`` to ``width`` (never upscaling) as a progressive JPEG."""
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _variant_path(source, version, width):
+    return ASSETS_CACHE_DIR / f"{source.stem}-{version}-{width}w.jpg"
+
+
+def _load_or_encode(source, width):
+    path = _variant_path(source, file_hash(source), width)
+    if path.exists():
+        return path.read_bytes()
+
+    content = encode_variant(source, width)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+    return content
+
+
+def image_variant(source, width):
+    """JPEG bytes of ``source`` at ``width`` pixels, from the in-memory cache."""
+    source = _resolve(source)
+    key = (source, width)
+    content = _variants.get(key)
+    if content is None:
+        with _lock:
+            content = _variants.get(key)
+            if content is None:
+                content = _variants[key] = _load_or_encode(source, width)
+    return content
+
+
+def build_variants(sources=None, widths=IMAGE_WIDTHS):
+    """Pre-generate every width of every image; defaults to all of images/."""
+    if sources is None:
+        sources = sorted(config.IMAGES_DIR.glob("*.jpg"))
+    for source in sources:
+        for width in widths:
+            image_variant(source, width)
+
+
+if __name__ == "__main__":
+    build_variants()
+    for (source, width), content in sorted(_variants.items()):
+        print(f"{source.name} {width}w: {len(content) / 1024:.0f} KiB")
@@ -0,0 +1,315 @@
+# coding: utf-8
+
+"""Plotly figure builders for the pages.
+
+They live outside the page scripts so the landing-page warm-up can build the
+same figures the pages would, under the same figure-cache keys.
+"""
+
+import pandas as pd
+
+from utils.lazy_imports import go, px
+
+# Bump when a figure builder changes, so figures stored by older code in the
+# shared cache are not served
+FIGURE_VERSION = 1
+
+# Mapping from short labels to full names for income groups
+INCOME_LABELS = {
+    'LM': 'Low Income',
+    'UM': 'Upper Middle Income',
+    'H': 'High Income'
+}
+
+# Define the color mapping for income groups
+INCOME_COLORS = {
+    'Low Income': 'blue',
+    'Upper Middle Income': 'grey',
+    'High Income': 'green'
+}
+
+# Income groups drawn on the death-rate charts of the Air Pollution Impact
+# page (Upper Middle Income is left out there)
+DEATH_CHART_INCOME_LABELS = {short: INCOME_LABELS[short] for short in ('LM', 'H')}
+
+
+def income_group_figure(aggregated_data):
+    # aggregated_data holds the mean of the standardized death total per 'year' and 'ig_label'
+
+    # Apply the mapping to the 'ig_label' column
+    aggregated_data['ig_label'] = aggregated_data['ig_label'].astype(str).map(DEATH_CHART_INCOME_LABELS)
+
+    # Plot the line chart using the aggregated data
+    fig = px.line(
+        aggregated_data,
+        x='year',
+        y='total_death_attributed_sex_standarized',
+        color='ig_label',
+        color_discrete_map=INCOME_COLORS,
+        labels={'total_death_attributed_sex_standarized': 'Percentage of Deaths', 'ig_label': 'Income Group'}
+    )
+
+    # Improve layout for better readability
+    fig.update_layout(
+        xaxis_title='Year',
+        yaxis_title='Percentage of population Deaths',
+        showlegend=True,
+        legend_title_text='Historical Income Group Clasification'
+    )
+
+    # Set x-axis tick marks to show each year
+    fig.update_xaxes(
+        tickvals=aggregated_data['year'].unique(),
+        tickangle=45
+    )
+
+    return fig
+
+
+def who_standards_figure(df_mean_levels, who_standards, eu_standards, selected_pollutant):
+    # The difference from the WHO standard is precomputed; sort on it
+    standard_who = who_standards[selected_pollutant]['annual']
+    df_filtered = df_mean_levels.sort_values('difference', ascending=False)
+
+    # Define a custom color sequence for the regions
+    custom_colors = ['teal', 'crimson', 'forestgreen', 'darkorange', 'goldenrod', 'darkslateblue', 'plum']
+
+    # Updating the Plotly figure to use the sorted data with custom colors
+    fig = px.bar(df_filtered, x='country', y='air_pollutant_level', color='region',
+                 #title=f'Average {selected_pollutant} Emissions by Country in 2023'
+                 labels={'country': 'Country', 'air_pollutant_level': f'Average {selected_pollutant} Level (μg/m³)'},
+                 color_discrete_sequence=custom_colors)
+
+    # Rotating the x-axis labels
+    fig.update_layout(xaxis_tickangle=-45)
+      
+
+    # Setting a fixed y-axis range
+    fig.update_yaxes(autorange=True)
+
+    # Setting the figure size and moving the legend position outside to the right
+    fig.update_layout(
+        height=600,
+        width=1400,
+        legend=dict(
+            yanchor="middle",
+            y=0.5,
+            xanchor="left",
+            x=1.05  # This places the legend outside the plot to the right
+        ),
+        margin=dict(r=150) 
+    )
+
+    # Add the EU standard line if it exists for the selected pollutant
+    eu_standard = eu_standards.get(selected_pollutant, {}).get('annual')
+    if eu_standard is not None:
+        # Add a dummy trace for the EU standard to appear in the legend
+        fig.add_trace(
+            go.Scatter(
+                x=[None], 
+                y=[None], 
+                mode='lines', 
+                name=f"EU {selected_pollutant} Annual Standard 2011 (μg/m³)", 
+                line=dict(color='blue', dash='dash')
+            )
+        )
+        # Add the actual EU standard line (without a name parameter)
+        fig.add_hline(y=eu_standard, line_dash='dash', line_color='blue')
+
+    # Add the WHO standard line and a corresponding dummy trace for the legend
+    fig.add_trace(
+        go.Scatter(
+            x=[None],
+            y=[None],
+            mode='lines',
+            name=f"WHO {selected_pollutant} Annual Standard 2021 (μg/m³)",
+            line=dict(color='red', width=2)
+        )
+    )
+    # Add the actual WHO standard line (without a name parameter)
+    fig.add_hline(y=standard_who, line_dash='solid', line_color='red')
+
+    return fig
+
+
+def gni_figure(df, group_fits, selected_pollutant, selected_year, selected_region):
+    # Country points behind the selected fits
+    mask = (df['air_pollutant'] == selected_pollutant) & (df['year'] == selected_year)
+    if selected_region != 'All':
+        mask &= df['region'] == selected_region
+    points = df.loc[mask, ['country', 'ig_label', 'GNI_per_capita', 'population', 'air_pollutant_level']]
+    points = points.assign(ig_label=points['ig_label'].astype(str).map(INCOME_LABELS))
+    unit = df.loc[mask, 'unit_air_poll_lvl'].astype(str).iloc[0]
+
+    fig = px.scatter(
+        points,
+        x='GNI_per_capita',
+        y='air_pollutant_level',
+        color='ig_label',
+        size='population',
+        hover_name='country',
+        color_discrete_map=INCOME_COLORS,
+        labels={
+            'GNI_per_capita': 'GNI per capita',
+            'air_pollutant_level': f'{selected_pollutant} Level ({unit})',
+            'ig_label': 'Income Group'
+        }
+    )
+
+    # Add the population-weighted regression line of each income group
+    x_range = [points['GNI_per_capita'].min(), points['GNI_per_capita'].max()]
+    for ig_label, fit in group_fits.iterrows():
+        label = INCOME_LABELS.get(ig_label)
+        if label is None or pd.isna(fit['slope']):
+            continue
+        fig.add_trace(
+            go.Scatter(
+                x=x_range,
+                y=[fit['intercept'] + fit['slope'] * x for x in x_range],
+                mode='lines',
+                name=f"{label} trend",
+                line=dict(color=INCOME_COLORS[label], dash='dash')
+            )
+        )
+
+    fig.update_layout(
+        xaxis_title='GNI per capita',
+        yaxis_title=f'{selected_pollutant} Level ({unit})',
+        legend_title_text='Income Group'
+    )
+    return fig
+
+
+# Animated views: every year is a frame of one figure, so playing or
+# scrubbing through the years happens in the browser without reruns
+
+def _animation_controls(years, active=0, frame_duration=500):
+    """Play/pause buttons and a year slider, laid out like Plotly Express animations."""
+    play = dict(frame=dict(duration=frame_duration, redraw=True), fromcurrent=True, transition=dict(duration=0))
+    pause = dict(frame=dict(duration=0, redraw=False), mode='immediate', transition=dict(duration=0))
+    updatemenus = [dict(
+        type='buttons',
+        direction='left',
+        showactive=False,
+        x=0.1, y=0, xanchor='right', yanchor='top',
+        pad=dict(r=10, t=70),
+        buttons=[
+            dict(label='▶', method='animate', args=[None, play]),
+            dict(label='◼', method='animate', args=[[None], pause]),
+        ]
+    )]
+    sliders = [dict(
+        active=active,
+        x=0.1, y=0, xanchor='left', yanchor='top', len=0.9,
+        pad=dict(b=10, t=60),
+        currentvalue=dict(prefix='Year: '),
+        steps=[
+            dict(label=str(year), method='animate', args=[[str(year)], pause])
+            for year in years
+        ]
+    )]
+    return updatemenus, sliders
+
+
+def _padded_range(values, padding=0.05):
+    low, high = float(values.min()), float(values.max())
+    margin = (high - low) * padding or 1.0
+    return [low - margin, high + margin]
+
+
+def income_group_animation(aggregated_data):
+    """Income-group lines drawn year by year, with the axes fixed to the full period."""
+    measure = 'total_death_attributed_sex_standarized'
+
+    data = aggregated_data.assign(ig_label=aggregated_data['ig_label'].astype(str).map(DEATH_CHART_INCOME_LABELS))
+    data = data.dropna(subset=['ig_label']).sort_values('year')
+    years = sorted(data['year'].unique().tolist())
+    series = {label: data[data['ig_label'] == label] for label in DEATH_CHART_INCOME_LABELS.values()}
+
+    def traces(until):
+        # One trace per income group in every frame, so frames line up trace by trace
+        shown = []
+        for label, rows in series.items():
+            rows = rows[rows['year'] <= until]
+            shown.append(go.Scatter(
+                x=rows['year'], y=rows[measure], mode='lines+markers', name=label,
+                line=dict(color=INCOME_COLORS[label])
+            ))
+        return shown
+
+    frames = [go.Frame(name=str(year), data=traces(year)) for year in years]
+    updatemenus, sliders = _animation_controls(years, active=len(years) - 1)
+
+    fig = go.Figure(data=traces(years[-1]), frames=frames)
+    fig.update_layout(
+        xaxis=dict(title='Year', range=_padded_range(data['year']), tickvals=years, tickangle=45),
+        yaxis=dict(title='Percentage of population Deaths', range=_padded_range(data[measure])),
+        legend_title_text='Historical Income Group Clasification',
+        updatemenus=updatemenus,
+        sliders=sliders
+    )
+    return fig
+
+
+def gni_animation(df, fits, selected_pollutant, selected_region, start_year):
+    """Country bubbles and income-group trends for every year of one pollutant and region."""
+    # One pass over the data for the whole animation
+    mask = df['air_pollutant'] == selected_pollutant
+    if selected_region != 'All':
+        mask &= df['region'] == selected_region
+    points = df.loc[mask, ['year', 'country', 'ig_label', 'GNI_per_capita', 'population', 'air_pollutant_level']]
+    points = points.assign(ig_label=points['ig_label'].astype(str).map(INCOME_LABELS))
+    unit = df.loc[mask, 'unit_air_poll_lvl'].astype(str).iloc[0]
+    years = sorted(points['year'].unique().tolist())
+
+    # Fits of every year of the selection, from the precomputed table
+    try:
+        year_fits = fits.xs((selected_pollutant, selected_region), level=['air_pollutant', 'region'])
+    except KeyError:
+        year_fits = pd.DataFrame(columns=['slope', 'intercept'])
+
+    # Bubble area proportional to population, with the same scale in every frame
+    sizeref = 2.0 * points['population'].max() / (20 ** 2)
+    by_year = dict(tuple(points.groupby('year', sort=True)))
+    labels = list(INCOME_LABELS.items())
+
+    def traces(year):
+        # Fixed trace order (bubbles then trends per income group) so frames line up
+        rows = by_year.get(year, points.iloc[:0])
+        x_range = [rows['GNI_per_capita'].min(), rows['GNI_per_capita'].max()]
+        bubbles, trends = [], []
+        for short_label, label in labels:
+            group = rows[rows['ig_label'] == label]
+            bubbles.append(go.Scatter(
+                x=group['GNI_per_capita'], y=group['air_pollutant_level'], mode='markers', name=label,
+                text=group['country'], hovertemplate='<b>%{text}</b><br>GNI per capita=%{x}<br>Level=%{y}<extra></extra>',
+                marker=dict(color=INCOME_COLORS[label], size=group['population'], sizemode='area',
+                            sizeref=sizeref, sizemin=2)
+            ))
+            try:
+                fit = year_fits.loc[(year, short_label)]
+            except KeyError:
+                fit = None
+            if fit is None or pd.isna(fit['slope']) or rows.empty:
+                x, y = [None], [None]
+            else:
+                x, y = x_range, [fit['intercept'] + fit['slope'] * value for value in x_range]
+            trends.append(go.Scatter(
+                x=x, y=y, mode='lines', name=f"{label} trend",
+                line=dict(color=INCOME_COLORS[label], dash='dash')
+            ))
+        return bubbles + trends
+
+    frames = [go.Frame(name=str(year), data=traces(year)) for year in years]
+    active = years.index(start_year) if start_year in years else len(years) - 1
+    updatemenus, sliders = _animation_controls(years, active=active)
+
+    fig = go.Figure(data=traces(years[active]), frames=frames)
+    fig.update_layout(
+        xaxis=dict(title='GNI per capita', range=_padded_range(points['GNI_per_capita'])),
+        yaxis=dict(title=f'{selected_pollutant} Level ({unit})', range=_padded_range(points['air_pollutant_level'])),
+        legend_title_text='Income Group',
+        updatemenus=updatemenus,
+        sliders=sliders
+    )
+    return fig
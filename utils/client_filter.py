@@ -0,0 +1,36 @@
+# coding: utf-8
+
+"""Browser-side filtering for the WHO standards chart.
+
+In this mode the page sends the compact aggregate from
+``page_data.load_who_payload`` to a custom component once per page load. The
+region, pollutant and sort filters and the WHO/EU reference lines are then
+applied in the browser, so exploring the chart causes no reruns and no
+server work. The component is plain HTML and JavaScript under
+``components/who_explorer`` (no build step) and loads the plotly.js bundled
+with the installed plotly package from its own directory (see
+``utils.plotly_js``).
+"""
+
+from pathlib import Path
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from utils import config
+from utils.plotly_js import plotly_js
+
+COMPONENT_DIR = Path(__file__).parent / "components" / "who_explorer"
+
+_who_explorer = components.declare_component("who_explorer", path=str(COMPONENT_DIR))
+
+
+def client_filtering_enabled():
+    if config.CLIENT_FILTERING:
+        return True
+    return st.query_params.get("filter") == "client"
+
+
+def who_explorer(payload, key="who_explorer"):
+    """Render the client-side WHO standards explorer for ``payload``."""
+    _who_explorer(payload=payload, plotly_js=plotly_js(COMPONENT_DIR), key=key, default=None)
@@ -0,0 +1,72 @@
+# coding: utf-8
+
+"""Paths and settings shared by every page of the app."""
+
+import os
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+# Seed CSVs shipped with the app; read-only, refreshed versions go to REFRESHED_DIR
+DATASET_DIR = Path(os.environ.get("CLIMATE_DATASET_DIR", ROOT_DIR / "dataset"))
+CACHE_DIR = Path(os.environ.get("CLIMATE_CACHE_DIR", ROOT_DIR / ".cache"))
+
+REMOTE_BASE_URL = "https://raw.githubusercontent.com/JesHP73/climanteinterlense/main/dataset/"
+
+# "local" reads the CSVs shipped in dataset/, "remote" downloads them from GitHub
+DATA_SOURCE = os.environ.get("CLIMATE_DATA_SOURCE", "local")
+
+# Upper bound on the serialized figures kept by utils.figure_cache, in bytes
+FIGURE_CACHE_BYTES = int(os.environ.get("CLIMATE_FIGURE_CACHE_BYTES", 32 * 1024 * 1024))
+
+# Per-rerun timing records written by utils.metrics
+METRICS_FILE = Path(os.environ.get("CLIMATE_METRICS_FILE", CACHE_DIR / "metrics" / "reruns.jsonl"))
+METRICS_MAX_BYTES = int(os.environ.get("CLIMATE_METRICS_MAX_BYTES", 10 * 1024 * 1024))
+METRICS_BACKUPS = int(os.environ.get("CLIMATE_METRICS_BACKUPS", 3))
+
+# Show the timing panel in the sidebar for every session, not just ?debug=1
+METRICS_DEBUG = os.environ.get("CLIMATE_METRICS_DEBUG", "") == "1"
+
+# Base URL or directory polled by utils.refresher for new dataset versions;
+# refreshing is disabled while this is empty
+REFRESH_SOURCE = os.environ.get("CLIMATE_REFRESH_SOURCE", "")
+REFRESH_INTERVAL = float(os.environ.get("CLIMATE_REFRESH_INTERVAL", 3600))
+REFRESHED_DIR = Path(os.environ.get("CLIMATE_REFRESHED_DIR", CACHE_DIR / "datasets"))
+
+IMAGES_DIR = ROOT_DIR / "images"
+
+# Year/pollutant-partitioned Arrow stores written by utils.store
+STORE_DIR = Path(os.environ.get("CLIMATE_STORE_DIR", CACHE_DIR / "store"))
+
+# SQLite result cache shared by every server process on the host; 0 bytes disables it
+SHARED_CACHE_PATH = Path(os.environ.get("CLIMATE_SHARED_CACHE_PATH", CACHE_DIR / "results.sqlite"))
+SHARED_CACHE_BYTES = int(os.environ.get("CLIMATE_SHARED_CACHE_BYTES", 256 * 1024 * 1024))
+
+# Filter the WHO standards chart in the browser from one aggregate sent per
+# page load, instead of rerunning the script on every filter change; a
+# session can also opt in with ?filter=client
+CLIENT_FILTERING = os.environ.get("CLIMATE_CLIENT_FILTERING", "") == "1"
+
+# On-demand rerun profiles written by utils.profiling. An operator opts a
+# session in with ?profile=sample or ?profile=cprofile plus
+# &profile_token=<CLIMATE_PROFILE_TOKEN>; without a configured token the query
+# parameters are ignored. Every rerun of the pages listed in
+# CLIMATE_PROFILE_PAGES (comma-separated, e.g. air_pollution_impact) is
+# profiled in CLIMATE_PROFILE_MODE. Only the newest PROFILE_MAX_CAPTURES are kept.
+PROFILE_TOKEN = os.environ.get("CLIMATE_PROFILE_TOKEN", "")
+PROFILES_DIR = Path(os.environ.get("CLIMATE_PROFILES_DIR", CACHE_DIR / "profiles"))
+PROFILE_PAGES = [page for page in os.environ.get("CLIMATE_PROFILE_PAGES", "").split(",") if page]
+PROFILE_MODE = os.environ.get("CLIMATE_PROFILE_MODE", "sample")
+PROFILE_INTERVAL = float(os.environ.get("CLIMATE_PROFILE_INTERVAL", 0.005))
+PROFILE_MAX_CAPTURES = int(os.environ.get("CLIMATE_PROFILE_MAX_CAPTURES", 200))
+
+# Filtered-data exports written by utils.export, in chunks of EXPORT_CHUNK_ROWS
+# rows. Streamlit's static file server (server.enableStaticServing) streams
+# them from disk, so CLIMATE_EXPORT_DIR has to stay an "exports" directory
+# directly under the app's static/ directory: the download links point at
+# app/static/exports/. That server refuses files over 200 MB, so an export is
+# split into parts of about EXPORT_PART_BYTES; only the newest
+# EXPORT_MAX_FILES exports are kept.
+EXPORT_DIR = Path(os.environ.get("CLIMATE_EXPORT_DIR", ROOT_DIR / "static" / "exports"))
+EXPORT_CHUNK_ROWS = int(os.environ.get("CLIMATE_EXPORT_CHUNK_ROWS", 50_000))
+EXPORT_PART_BYTES = int(os.environ.get("CLIMATE_EXPORT_PART_BYTES", 128 * 1024 * 1024))
+EXPORT_MAX_FILES = int(os.environ.get("CLIMATE_EXPORT_MAX_FILES", 100))
@@ -0,0 +1,163 @@
+# coding: utf-8
+
+"""Local-first dataset loading with an on-disk Parquet cache.
+
+The CSVs in ``dataset/`` are parsed and typed once, then written next to the
+app as Parquet files named after the CSV's content hash, so later cold starts
+read the typed columnar copy directly and never touch the network.
+
+``dataset/`` is read-only seed data: a version downloaded by the refresher
+is written to ``config.REFRESHED_DIR`` as ``<stem>-<hash>.csv`` and used
+from then on, unless the seed file is replaced by a more recent one.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+
+import pandas as pd
+
+from utils import config
+from utils.schema import SCHEMA_VERSION, apply_schema
+
+# Loaded frames are shared by every session of the process; with copy-on-write
+# a filter or column assignment in one session can never modify the shared data
+pd.set_option("mode.copy_on_write", True)
+
+# Short dataset names used by the pages, mapped to the files in dataset/
+DATASETS = {
+    "global_burden": "global_bourden_risk_factor.csv",
+    "who_standards": "who_standars_air_quality_countries.csv",
+    "pollution_by_industry": "pollution_by_industry_2023.csv",
+    "air_quality_gni": "air_quality_vs_gni_agg.csv",
+}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return a short sha256 digest of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def content_hash(content):
+    """Same digest as ``file_hash`` for bytes already in memory."""
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def _tmp_path(path):
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _stem(name):
+    return os.path.splitext(DATASETS[name])[0]
+
+
+def dataset_path(name):
+    """Path of the current CSV of a dataset: the seed in dataset/ or a newer refreshed copy."""
+    seed = config.DATASET_DIR / DATASETS[name]
+    candidates = [seed, *config.REFRESHED_DIR.glob(f"{_stem(name)}-*.csv")]
+
+    def written(path):
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            # e.g. a refreshed copy replaced meanwhile
+            return -1
+
+    newest = max(candidates, key=written)
+    return newest if written(newest) >= 0 else seed
+
+
+# path -> (mtime_ns, size, digest), so unchanged files are not re-hashed
+_versions = {}
+
+
+def dataset_version(name):
+    """Content hash identifying the current version of a local dataset."""
+    path = dataset_path(name)
+    stat = path.stat()
+    known = _versions.get(path)
+    if known is None or known[:2] != (stat.st_mtime_ns, stat.st_size):
+        known = (stat.st_mtime_ns, stat.st_size, file_hash(path))
+        _versions[path] = known
+    return known[2]
+
+
+def _cache_path(name, version):
+    return config.CACHE_DIR / f"{_stem(name)}-v{SCHEMA_VERSION}-{version}.parquet"
+
+
+def _write_cache(data, name, path):
+    # Write to a temporary file first so a concurrent reader never sees a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _tmp_path(path)
+    data.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    # Drop cached copies of older versions of the same CSV
+    for stale in path.parent.glob(f"{_stem(name)}-*.parquet"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def fetch_remote(name, timeout=30):
+    """Raw CSV bytes of a dataset from ``config.REMOTE_BASE_URL``."""
+    with urllib.request.urlopen(config.REMOTE_BASE_URL + DATASETS[name], timeout=timeout) as response:
+        return response.read()
+
+
+def load_versioned(name, source=None):
+    """Load a typed dataset by name together with the version it was loaded at.
+
+    ``source`` overrides ``config.DATA_SOURCE``; only ``"remote"`` fetches the
+    CSV from GitHub, and its version is the hash of the downloaded content, so
+    cache keys follow the data actually loaded rather than any local copy.
+    Local datasets prefer the cached Parquet copy.
+    """
+    source = source or config.DATA_SOURCE
+    if source == "remote":
+        content = fetch_remote(name)
+        return apply_schema(pd.read_csv(io.BytesIO(content)), name), content_hash(content)
+
+    version = dataset_version(name)
+    cached = _cache_path(name, version)
+    if cached.exists():
+        return pd.read_parquet(cached), version
+
+    data = apply_schema(pd.read_csv(dataset_path(name)), name)
+    _write_cache(data, name, cached)
+    return data, version
+
+
+def load_dataset(name, source=None):
+    """Load a typed dataset by name; see ``load_versioned``."""
+    return load_versioned(name, source)[0]
+
+
+def store_dataset(name, content, data):
+    """Make ``content`` the current CSV of a dataset and cache its typed frame ``data``.
+
+    The CSV is written to ``config.REFRESHED_DIR``, never over the seed in
+    dataset/; both files appear atomically. Returns the new version.
+    """
+    version = content_hash(content)
+    config.REFRESHED_DIR.mkdir(parents=True, exist_ok=True)
+    path = config.REFRESHED_DIR / f"{_stem(name)}-{version}.csv"
+    tmp_path = _tmp_path(path)
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+    stat = path.stat()
+    _versions[path] = (stat.st_mtime_ns, stat.st_size, version)
+    _write_cache(data, name, _cache_path(name, version))
+
+    # Drop the copies of older refreshed versions
+    for stale in config.REFRESHED_DIR.glob(f"{_stem(name)}-*.csv"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return version
@@ -0,0 +1,262 @@
+# coding: utf-8
+
+"""Filtered data behind the charts, exported as CSV or Parquet in chunks.
+
+An export is a generator of frames (slices of the current snapshot, filtered
+one at a time, or batches scanned from the partitioned store), encoded chunk
+by chunk: CSV rows after a single header, or one Parquet row group per
+chunk. The encoded pieces are streamed to a file under
+``config.EXPORT_DIR``, so peak memory is one chunk whatever the size of the
+export, and no copy of the selection is built per click.
+
+The export is a directory named after the dataset version and the selection,
+so repeated clicks and other sessions reuse it. With
+``server.enableStaticServing`` on (see ``.streamlit/config.toml``) the
+browser downloads it from ``app/static/exports/``, which Streamlit streams
+from disk; otherwise it falls back to ``st.download_button``, which holds
+the file in memory. The static server answers 404 for files over
+``MAX_APP_STATIC_FILE_SIZE``, so a large export is split into parts of about
+``config.EXPORT_PART_BYTES``, each a complete CSV or Parquet file.
+"""
+
+import io
+import os
+import re
+import shutil
+import threading
+from html import escape
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from streamlit.web.server.app_static_file_handler import MAX_APP_STATIC_FILE_SIZE
+
+from utils import config
+from utils.shared_cache import make_key
+
+# Format label -> file suffix
+FORMATS = {"CSV": ".csv", "Parquet": ".parquet"}
+
+STATIC_URL = "app/static/exports"
+
+_prune_lock = threading.Lock()
+
+
+def frame_chunks(frame, chunk_rows=config.EXPORT_CHUNK_ROWS):
+    """Consecutive row slices of ``frame``; slicing copies nothing."""
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def filtered_chunks(frame, mask, columns=None, chunk_rows=config.EXPORT_CHUNK_ROWS):
+    """Rows of ``frame`` where ``mask(chunk)`` holds, filtered one slice at a time."""
+    for chunk in frame_chunks(frame, chunk_rows):
+        chunk = chunk[mask(chunk)]
+        yield chunk if columns is None else chunk[columns]
+
+
+def csv_chunks(chunks):
+    """UTF-8 CSV of ``chunks``: the header with the first chunk, then rows only."""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+class _Pipe(io.RawIOBase):
+    """Write-only file that hands over what was written since the last ``drain``."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def parquet_chunks(chunks):
+    """Parquet file of ``chunks``, one row group per chunk, as consecutive byte strings.
+
+    The schema is taken from the first chunk; later chunks are converted to it,
+    so a chunk whose column is all missing keeps the column's type.
+    """
+    pipe = _Pipe()
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = pq.ParquetWriter(pipe, table.schema, compression="zstd")
+        else:
+            table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+        writer.write_table(table)
+        yield pipe.drain()
+    if writer is not None:
+        writer.close()
+        yield pipe.drain()
+
+
+ENCODERS = {"CSV": csv_chunks, "Parquet": parquet_chunks}
+
+
+def export_name(name, version, selection, fmt):
+    """Directory name of one export: the dataset, then a digest of its version, selection and format."""
+    return f"{name}-{make_key(version, selection)[:16]}-{FORMATS[fmt][1:]}"
+
+
+def write_export(directory, fmt, chunks):
+    """Stream ``chunks`` encoded as ``fmt`` to part files in ``directory``, which appears only once complete.
+
+    A part is closed once it holds ``config.EXPORT_PART_BYTES``, before the
+    next chunk is taken, and the following chunks start a new part.
+    """
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = directory.with_name(f".{directory.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+    chunks = iter(chunks)
+    written = 0
+
+    def part_chunks(first):
+        yield first
+        while written < config.EXPORT_PART_BYTES:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    try:
+        chunk = next(chunks, None)
+        part = 1
+        while part == 1 or chunk is not None:
+            written = 0
+            with open(tmp_dir / f"part{part:03d}{FORMATS[fmt]}", "wb") as handle:
+                for piece in ENCODERS[fmt](part_chunks(chunk) if chunk is not None else ()):
+                    handle.write(piece)
+                    written += len(piece)
+            chunk = next(chunks, None)
+            part += 1
+        try:
+            tmp_dir.rename(directory)
+        except OSError:
+            # Written by another session meanwhile
+            if not directory.is_dir():
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    _prune(directory.parent)
+
+
+def export_parts(directory):
+    """``(path, size)`` of each part of the export in ``directory``.
+
+    Raises ``FileNotFoundError`` if the export does not exist (any more).
+    """
+    return [(path, path.stat().st_size) for path in sorted(directory.iterdir())]
+
+
+def export_file(name, version, selection, fmt, chunks):
+    """Parts of the export, written from ``chunks()`` unless an identical one exists."""
+    directory = config.EXPORT_DIR / export_name(name, version, selection, fmt)
+    try:
+        # Reused: refresh its age so pruning keeps it
+        os.utime(directory)
+        return export_parts(directory)
+    except FileNotFoundError:
+        pass
+    write_export(directory, fmt, chunks())
+    return export_parts(directory)
+
+
+def _prune(directory):
+    with _prune_lock:
+        exports = []
+        for path in directory.iterdir():
+            if not path.name.startswith("."):
+                try:
+                    exports.append((path.stat().st_mtime, path))
+                except FileNotFoundError:
+                    # Pruned by another server process meanwhile
+                    continue
+        exports.sort()
+        for _, stale in exports[:max(len(exports) - config.EXPORT_MAX_FILES, 0)]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def _download_link(path, size, download_name):
+    if size > MAX_APP_STATIC_FILE_SIZE:
+        # A single chunk larger than the limit; the static server would answer 404
+        st.error(
+            f"{download_name} is {size:,} bytes, over the {MAX_APP_STATIC_FILE_SIZE:,} bytes the server "
+            "can send. Narrow the selection or lower CLIMATE_EXPORT_CHUNK_ROWS to export it."
+        )
+        return
+    # Same-origin link with the download attribute: saved under download_name, streamed from disk
+    href = f"{STATIC_URL}/{path.parent.name}/{path.name}"
+    st.markdown(
+        f'<a href="{escape(href)}" download="{escape(download_name)}">⬇️ Download {escape(download_name)}</a>'
+        f" ({size:,} bytes)",
+        unsafe_allow_html=True,
+    )
+
+
+def _offer(parts, download_name, key):
+    stem, suffix = os.path.splitext(download_name)
+    static = st.get_option("server.enableStaticServing")
+    if len(parts) > 1:
+        st.caption(f"Split into {len(parts)} files of about {config.EXPORT_PART_BYTES:,} bytes.")
+    for index, (path, size) in enumerate(parts, start=1):
+        part_name = download_name if len(parts) == 1 else f"{stem}-part{index}{suffix}"
+        if static:
+            _download_link(path, size, part_name)
+        else:
+            with open(path, "rb") as handle:
+                st.download_button(
+                    f"⬇️ Download {part_name}", handle, file_name=part_name, key=f"{key}_download_{index}"
+                )
+
+
+def export_controls(name, version, selection, exports, key):
+    """Export widgets for the data behind a chart.
+
+    ``exports`` maps a label (e.g. "Chart data") to a function returning the
+    chunks of that data for ``selection``. Nothing is encoded until the user
+    asks for a file, and an identical export written earlier is offered
+    straight away.
+    """
+    with st.expander("⬇️ Export the data behind this chart"):
+        col1, col2 = st.columns(2)
+        with col1:
+            label = st.radio("Data", list(exports), horizontal=True, key=f"{key}_data")
+        with col2:
+            fmt = st.radio("Format", list(FORMATS), horizontal=True, key=f"{key}_format")
+
+        export_selection = (label, selection)
+        directory = config.EXPORT_DIR / export_name(name, version, export_selection, fmt)
+        if not directory.is_dir() and not st.button("Prepare file", key=f"{key}_prepare"):
+            return
+
+        slug = re.sub(r"\W+", "_", label.lower())
+        download_name = f"{name}-{slug}{FORMATS[fmt]}"
+        with st.spinner("Writing the export..."):
+            parts = export_file(name, version, export_selection, fmt, exports[label])
+        try:
+            _offer(parts, download_name, key)
+        except FileNotFoundError:
+            # Pruned by another session since it was listed: write it again
+            shutil.rmtree(directory, ignore_errors=True)
+            parts = export_file(name, version, export_selection, fmt, exports[label])
+            _offer(parts, download_name, key)
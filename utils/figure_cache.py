@@ -0,0 +1,113 @@
+# coding: utf-8
+
+"""Process-wide LRU cache of built Plotly figures.
+
+Figures are stored as JSON keyed by (page, normalized filters, dataset
+version), so a repeated sidebar selection skips both the pandas work and the
+figure construction. The cache is bounded by the total size of the stored
+JSON and evicts the least recently used figures first. Misses fall back to
+the host-wide ``shared_cache`` before building, so figures built by another
+server process are reused.
+"""
+
+import threading
+from collections import OrderedDict
+
+from utils import config
+from utils.charts import FIGURE_VERSION
+from utils.lazy_imports import pio
+from utils.shared_cache import make_key, shared_cache
+
+
+def normalize_filters(**filters):
+    """Turn filter values into a hashable tuple that ignores selection order."""
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = tuple(sorted(value))
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+class FigureCache:
+    """Size-bounded LRU mapping of cache keys to serialized figures."""
+
+    def __init__(self, max_bytes=config.FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached figure for ``key``, or ``None`` on a miss."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pio.from_json(payload)
+
+    def put(self, key, fig, payload=None):
+        """Store ``fig`` under ``key``, evicting old figures to stay in budget."""
+        payload = payload or fig.to_json()
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_build(self, page, filters, version, build):
+        """Return the cached figure for a selection, calling ``build()`` on a miss."""
+        key = (page, filters, version)
+        fig = self.get(key)
+        if fig is not None:
+            return fig
+
+        shared_key = make_key("figure", FIGURE_VERSION, page, filters, version)
+        payload = shared_cache.get(shared_key)
+        if payload is not None:
+            payload = payload.decode("utf-8")
+            fig = pio.from_json(payload)
+        else:
+            fig = build()
+            payload = fig.to_json()
+            shared_cache.put(shared_key, payload.encode("utf-8"))
+        self.put(key, fig, payload)
+        return fig
+
+    def invalidate(self, version):
+        """Drop every figure built from dataset ``version``."""
+        with self._lock:
+            for key in [key for key in self._entries if key[2] == version]:
+                self._bytes -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+# Shared by every session of this server process
+figure_cache = FigureCache()
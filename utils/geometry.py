@@ -0,0 +1,147 @@
+# coding: utf-8
+
+"""Pre-simplified European country outlines for the map view.
+
+The bundled outlines in ``dataset/geo/ne_110m_europe.geojson`` are the
+Natural Earth 1:110m admin-0 countries (public domain), with each feature's
+id set to its ``geo_code``. For every level of ``TOLERANCES`` they are
+clipped to Europe, simplified with Douglas-Peucker, quantized to a
+1/``SCALE`` degree grid and delta-encoded, then written next to the map
+component as ``europe-<level>-<hash>.json``. Streamlit serves component
+files with ``Cache-Control: public`` and the hash changes with the content,
+so a browser downloads each level once and reruns only send values per
+``geo_code``.
+
+Countries too small for the outlines are listed in ``POINTS`` and drawn as
+markers.
+
+Run ``python -m utils.geometry`` after replacing the source outlines (e.g.
+with the 1:50m release) to rebuild every level.
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from utils import config
+from utils.data_loader import content_hash
+from utils.map_view import GEOMETRY_DIR
+
+SOURCE = config.DATASET_DIR / "geo" / "ne_110m_europe.geojson"
+
+# Douglas-Peucker tolerance in degrees per level; the map picks a level by its width
+TOLERANCES = {"coarse": 0.25, "medium": 0.08, "fine": 0.0}
+
+# Quantization grid: 1/SCALE degrees (~1 km)
+SCALE = 100
+
+# Polygons whose bounding box misses this box (overseas territories) are dropped
+EUROPE_BOUNDS = (-32.0, 27.0, 45.0, 72.0)
+
+# geo_code -> (name, longitude, latitude) of countries missing from the outlines
+POINTS = {
+    "AD": ("Andorra", 1.52, 42.51),
+    "MT": ("Malta", 14.44, 35.90),
+    "SM": ("San Marino", 12.46, 43.94),
+}
+
+
+def simplify(ring, tolerance):
+    """Douglas-Peucker simplification of a closed ring given as an (n, 2) array."""
+    if tolerance <= 0 or len(ring) <= 4:
+        return ring
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = ring[start], ring[end]
+        inner = ring[start + 1:end]
+        dx, dy = b - a
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distance = np.hypot(*(inner - a).T)
+        else:
+            distance = np.abs(dx * (inner[:, 1] - a[1]) - dy * (inner[:, 0] - a[0])) / length
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack += [(start, split), (split, end)]
+    return ring[keep]
+
+
+def _in_europe(ring):
+    west, south, east, north = EUROPE_BOUNDS
+    return not (
+        ring[:, 0].max() < west or ring[:, 0].min() > east or ring[:, 1].max() < south or ring[:, 1].min() > north
+    )
+
+
+def encode_ring(ring):
+    """Quantized ring as a flat ``[x0, y0, dx1, dy1, ...]`` list of integers, or ``None`` if degenerate."""
+    grid = np.round(ring * SCALE).astype(np.int64)
+    # Drop points that fall on the same grid cell as their predecessor
+    grid = grid[np.r_[True, (np.diff(grid, axis=0) != 0).any(axis=1)]]
+    if len(grid) < 4:
+        return None
+    deltas = np.vstack([grid[:1], np.diff(grid, axis=0)])
+    return deltas.ravel().tolist()
+
+
+def encode_feature(geometry, tolerance):
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    encoded = []
+    for polygon in polygons:
+        rings = [np.asarray(ring, dtype="float64") for ring in polygon]
+        if not _in_europe(rings[0]):
+            continue
+        outer = encode_ring(simplify(rings[0], tolerance))
+        if outer is None:
+            continue
+        holes = [encode_ring(simplify(ring, tolerance)) for ring in rings[1:]]
+        encoded.append([outer] + [hole for hole in holes if hole is not None])
+
+    if not encoded and polygons:
+        # Never simplify a country away entirely; keep its largest polygon unsimplified
+        largest = max(polygons, key=lambda polygon: len(polygon[0]))
+        encoded.append([encode_ring(np.asarray(largest[0], dtype="float64"))])
+    return encoded
+
+
+def encode_level(source, tolerance):
+    features = [
+        {"id": feature["id"], "name": feature["properties"]["name"], "polygons": encode_feature(feature["geometry"], tolerance)}
+        for feature in source["features"]
+    ]
+    points = [{"id": code, "name": name, "lon": lon, "lat": lat} for code, (name, lon, lat) in POINTS.items()]
+    return {"scale": SCALE, "features": features, "points": points}
+
+
+def build_levels(source=SOURCE):
+    """Write every simplification level of ``source``; return ``{level: file name}``."""
+    with open(source, encoding="utf-8") as handle:
+        outlines = json.load(handle)
+
+    GEOMETRY_DIR.mkdir(parents=True, exist_ok=True)
+    written = {}
+    for level, tolerance in TOLERANCES.items():
+        content = json.dumps(encode_level(outlines, tolerance), separators=(",", ":")).encode("utf-8")
+        path = GEOMETRY_DIR / f"europe-{level}-{content_hash(content)}.json"
+        path.write_bytes(content)
+        for stale in GEOMETRY_DIR.glob(f"europe-{level}-*.json"):
+            if stale != path:
+                stale.unlink()
+        written[level] = path.name
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the simplified country outlines used by the map view.")
+    parser.add_argument("--source", default=SOURCE, help="GeoJSON of country outlines with geo_code feature ids")
+    args = parser.parse_args()
+    for level, name in build_levels(args.source).items():
+        print(f"{level}: {name} ({(GEOMETRY_DIR / name).stat().st_size:,} bytes)")
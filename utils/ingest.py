@@ -0,0 +1,194 @@
+# coding: utf-8
+
+"""Streaming ingestion of raw station-level EEA air-quality downloads.
+
+Raw EEA time-series files hold one row per station measurement and are far
+larger than memory. They are read in chunks; each chunk is mapped from
+station to ``geo_code``/station type, reduced to per-(country, pollutant,
+year, station type) sums, counts and maxima, and folded into a running
+aggregate that only grows with the number of groups. The result is written in
+the shape of ``pollution_by_industry_2023.csv`` (or, without station types,
+``who_standars_air_quality_countries.csv``) so the pages can load it as is.
+
+Usage:
+    python -m utils.ingest RAW.csv [RAW2.csv ...] --stations stations.csv
+                           --output dataset/pollution_by_industry.csv [--no-station-type]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import load_dataset
+from utils.standards import LIMITS
+
+# Column names in the EEA e-Reporting time-series downloads
+RAW_COLUMNS = {
+    "station": "AirQualityStation",
+    "pollutant": "AirPollutant",
+    "value": "Concentration",
+    "unit": "UnitOfMeasurement",
+    "time": "DatetimeBegin",
+    "validity": "Validity",
+}
+
+# Column names in the station metadata file
+STATION_COLUMNS = {
+    "station": "AirQualityStation",
+    "geo_code": "Countrycode",
+    "station_type": "AirQualityStationType",
+}
+
+UNIT_NAMES = {"ug.m-3": "ug/m3", "µg/m3": "ug/m3", "mg.m-3": "mg/m3"}
+
+GROUP_KEYS = ["geo_code", "air_pollutant", "unit_air_poll_lvl", "year", "air_qual_stat_type"]
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def load_stations(path):
+    """Station id -> (geo_code, station type) lookup from an EEA metadata file."""
+    stations = pd.read_csv(path, usecols=list(STATION_COLUMNS.values()), dtype=str)
+    stations = stations.rename(columns={v: k for k, v in STATION_COLUMNS.items()})
+    stations["station_type"] = stations["station_type"].str.title()
+    return stations.drop_duplicates("station").set_index("station")
+
+
+def country_dimension():
+    """geo_code -> country and region, taken from the shipped datasets."""
+    frames = [load_dataset(name)[["geo_code", "country", "region"]] for name in ("who_standards", "global_burden")]
+    countries = pd.concat(frames).astype(str).drop_duplicates("geo_code")
+    return countries.set_index("geo_code")
+
+
+def reduce_chunk(chunk, stations, pollutants):
+    """Per-group sum, count and max of the valid measurements of one chunk."""
+    chunk = chunk.rename(columns={v: k for k, v in RAW_COLUMNS.items()})
+    valid = (
+        (chunk["validity"] > 0)
+        & chunk["pollutant"].isin(pollutants)
+        & chunk["value"].notna()
+        & chunk["time"].notna()
+    )
+    chunk = chunk[valid]
+
+    station = stations.reindex(chunk["station"].to_numpy())
+    reduced = pd.DataFrame({
+        "geo_code": station["geo_code"].to_numpy(),
+        "air_pollutant": chunk["pollutant"].to_numpy(),
+        "unit_air_poll_lvl": chunk["unit"].replace(UNIT_NAMES).to_numpy(),
+        "year": chunk["time"].str.slice(0, 4).astype("int16").to_numpy(),
+        "air_qual_stat_type": station["station_type"].to_numpy(),
+        "value": chunk["value"].to_numpy(dtype="float64"),
+    })
+    # Measurements from stations missing in the metadata cannot be placed
+    reduced = reduced.dropna(subset=["geo_code", "air_qual_stat_type"])
+    return reduced.groupby(GROUP_KEYS, sort=False)["value"].agg(["sum", "count", "max"])
+
+
+def combine(running, partial):
+    """Fold a chunk's partial aggregate into the running one."""
+    if running is None:
+        return partial
+    both = pd.concat([running, partial])
+    return both.groupby(level=GROUP_KEYS, sort=False).agg({"sum": "sum", "count": "sum", "max": "max"})
+
+
+class Progress:
+    """Bytes and rows read so far, reported to stderr at most every ``interval`` seconds."""
+
+    def __init__(self, total_bytes, interval=2.0, stream=sys.stderr):
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.stream = stream
+        self.rows = 0
+        self.started = self._last = time.monotonic()
+
+    def update(self, done_bytes, rows, force=False):
+        self.rows += rows
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        share = done_bytes / self.total_bytes if self.total_bytes else 1.0
+        rate = self.rows / max(now - self.started, 1e-9)
+        print(f"\r{share:6.1%}  {self.rows:,} rows  {rate:,.0f} rows/s", end="", file=self.stream, flush=True)
+
+
+def aggregate_files(paths, stations, pollutants=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """Stream every raw file and return the per-group sums, counts and maxima."""
+    pollutants = list(LIMITS.index) if pollutants is None else pollutants
+    sizes = [os.path.getsize(path) for path in paths]
+    progress = progress or Progress(sum(sizes))
+
+    running = None
+    done_bytes = 0
+    for path, size in zip(paths, sizes):
+        with open(path, "rb") as handle:
+            reader = pd.read_csv(
+                handle,
+                usecols=list(RAW_COLUMNS.values()),
+                dtype={RAW_COLUMNS["value"]: "float64", RAW_COLUMNS["validity"]: "float64"},
+                chunksize=chunk_rows,
+            )
+            for chunk in reader:
+                running = combine(running, reduce_chunk(chunk, stations, pollutants))
+                progress.update(done_bytes + handle.tell(), len(chunk))
+        done_bytes += size
+    progress.update(done_bytes, 0, force=True)
+    print(file=progress.stream)
+    return running
+
+
+def to_dataset(running, countries, with_station_type=True):
+    """Running aggregate in the column layout the pages load."""
+    keys = GROUP_KEYS if with_station_type else [key for key in GROUP_KEYS if key != "air_qual_stat_type"]
+    totals = running.groupby(level=keys).agg({"sum": "sum", "count": "sum", "max": "max"}).reset_index()
+
+    level = totals["sum"] / totals["count"]
+    limit = LIMITS["who_2021_annual"].reindex(totals["air_pollutant"]).to_numpy()
+    country = countries.reindex(totals["geo_code"])
+
+    data = pd.DataFrame({
+        "air_pollutant": totals["air_pollutant"],
+        "unit_air_poll_lvl": totals["unit_air_poll_lvl"],
+        "air_pollutant_level": level,
+        "air_qual_stat_type": totals.get("air_qual_stat_type"),
+        "year": totals["year"],
+        "country": country["country"].to_numpy(),
+        "region": country["region"].to_numpy(),
+        # The EEA raw files carry no AQI; it is left empty
+        "AQI_Index": np.nan,
+        "geo_code": totals["geo_code"],
+        "exceedance_amount": np.maximum(level.to_numpy() - limit, 0),
+        "max_air_pollutant_level": totals["max"],
+        "measurement_count": totals["count"],
+    })
+    if not with_station_type:
+        data = data.drop(columns="air_qual_stat_type")
+    return data.dropna(subset=["country"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate raw EEA station files into the app's dataset shape.")
+    parser.add_argument("raw_files", nargs="+", help="EEA time-series CSV files")
+    parser.add_argument("--stations", required=True, help="EEA station metadata CSV")
+    parser.add_argument("--output", required=True, help="aggregate CSV to write")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--no-station-type", action="store_true", help="combine station types per country")
+    args = parser.parse_args(argv)
+
+    running = aggregate_files(args.raw_files, load_stations(args.stations), chunk_rows=args.chunk_rows)
+    if running is None:
+        parser.error("no valid measurements found")
+    data = to_dataset(running, country_dimension(), with_station_type=not args.no_station_type)
+    data.to_csv(args.output, index=False)
+    print(f"Wrote {len(data):,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# coding: utf-8
+
+"""Lazily imported plotting backends.
+
+Pages bind heavy modules with ``lazy_import`` so the import cost is only paid
+the first time an attribute is used, e.g. when a figure is built on a cache
+miss, instead of on the first script execution of every server process.
+"""
+
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """Return ``name`` from ``sys.modules`` if already imported, else a lazy proxy."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+# Backends shared by the pages
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objs")
+pio = lazy_import("plotly.io")
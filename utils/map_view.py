@@ -0,0 +1,45 @@
+# coding: utf-8
+
+"""Choropleth map of the WHO standards page, drawn by a custom component.
+
+The country outlines are static files next to the component (built by
+``python -m utils.geometry``), fetched and cached by the browser at the
+simplification level that suits the map's width. Each rerun only sends the
+selected pollutant's values per ``geo_code``, so redraws stay cheap as
+countries and years are added. plotly.js is the copy bundled with the
+installed plotly package, served from the component's directory (see
+``utils.plotly_js``), so the map needs no internet access.
+"""
+
+from pathlib import Path
+
+import streamlit.components.v1 as components
+
+from utils.plotly_js import plotly_js
+
+COMPONENT_DIR = Path(__file__).parent / "components" / "who_map"
+GEOMETRY_DIR = COMPONENT_DIR / "geo"
+
+_who_map = components.declare_component("who_map", path=str(COMPONENT_DIR))
+
+
+def geometry_files():
+    """Level -> path of its outlines file, relative to the component."""
+    return {
+        path.name.split("-")[1]: f"geo/{path.name}"
+        for path in sorted(GEOMETRY_DIR.glob("europe-*-*.json"))
+    }
+
+
+def who_map(values, pollutant, who_limit, eu_limit=None, key="who_map"):
+    """Render the map for ``values``: ``{geo_code: [level, difference from the WHO limit]}``."""
+    _who_map(
+        values=values,
+        pollutant=pollutant,
+        who_limit=who_limit,
+        eu_limit=eu_limit,
+        geometry=geometry_files(),
+        plotly_js=plotly_js(COMPONENT_DIR),
+        key=key,
+        default=None,
+    )
@@ -0,0 +1,169 @@
+# coding: utf-8
+
+"""Named timing spans around the hot path of each page rerun.
+
+A page wraps its script body in ``page_rerun``, which calls ``start_rerun``
+and, however the body ends, ``finish_rerun``; stages are timed with ``span``
+blocks. Fragments wrap their body in ``rerun_scope`` so a fragment-only rerun
+gets its own record. Each rerun is appended
+as one JSON line to a size-rotated file that monitoring can scrape, and the
+stage timings are shown in a sidebar panel when debugging is enabled with
+``?debug=1`` or ``CLIMATE_METRICS_DEBUG=1``. Reruns can also be profiled on
+demand; see ``utils.profiling``.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils import config, profiling
+
+# Each session's script runs in its own thread, so the active rerun is thread-local
+_local = threading.local()
+_logger_lock = threading.Lock()
+
+
+class Rerun:
+    """Stage durations collected during one script run of a page."""
+
+    def __init__(self, page, kind="script"):
+        self.page = page
+        self.kind = kind
+        self.selection = {}
+        self.stages = {}
+        self.profile = None
+        self.error = None
+        self.started = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def record(self):
+        ctx = get_script_run_ctx()
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "session_id": ctx.session_id if ctx else None,
+            "page": self.page,
+            "kind": self.kind,
+            "selection": self.selection,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "error": self.error,
+        }
+
+
+def _metrics_logger():
+    logger = logging.getLogger("climate.metrics")
+    with _logger_lock:
+        if not logger.handlers:
+            config.METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                config.METRICS_FILE,
+                maxBytes=config.METRICS_MAX_BYTES,
+                backupCount=config.METRICS_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def current_rerun():
+    return getattr(_local, "rerun", None)
+
+
+def start_rerun(page, kind="script"):
+    """Begin collecting spans for a page rerun in the current session thread."""
+    interrupted = current_rerun()
+    if interrupted is not None and interrupted.profile is not None:
+        # The previous run stopped before finish_rerun; drop its capture
+        interrupted.profile.stop()
+    _local.rerun = Rerun(page, kind)
+    _local.rerun.profile = profiling.start_capture(page)
+    return _local.rerun
+
+
+@contextmanager
+def page_rerun(page):
+    """Record a full script run of ``page``, also when the script raises or stops."""
+    rerun = start_rerun(page)
+    try:
+        yield rerun
+    except Exception as error:
+        rerun.error = type(error).__name__
+        raise
+    finally:
+        finish_rerun()
+
+
+@contextmanager
+def rerun_scope(page):
+    """Record a fragment-only rerun; a no-op inside a full script run."""
+    rerun = current_rerun()
+    if rerun is not None:
+        yield rerun
+        return
+    rerun = start_rerun(page, kind="fragment")
+    try:
+        yield rerun
+    except Exception as error:
+        rerun.error = type(error).__name__
+        raise
+    finally:
+        # Fragments cannot draw into the sidebar, so no debug panel here
+        finish_rerun(show_panel=False)
+
+
+def set_selection(**filters):
+    """Attach the sidebar selection to the current rerun record."""
+    rerun = current_rerun()
+    if rerun is not None:
+        rerun.selection.update(filters)
+
+
+@contextmanager
+def span(name):
+    """Time a stage of the current rerun; a no-op outside ``start_rerun``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun = current_rerun()
+        if rerun is not None:
+            rerun.add(name, time.perf_counter() - start)
+
+
+def debug_enabled():
+    if config.METRICS_DEBUG:
+        return True
+    return st.query_params.get("debug") == "1"
+
+
+def finish_rerun(show_panel=True):
+    """Write the current rerun record and show the debug panel if enabled."""
+    rerun = current_rerun()
+    if rerun is None:
+        return None
+    _local.rerun = None
+
+    if rerun.profile is not None:
+        rerun.profile.stop()
+    record = rerun.record()
+    if rerun.profile is not None:
+        record["profile"] = rerun.profile.save(record)
+    _metrics_logger().info(json.dumps(record, default=str))
+
+    if show_panel and debug_enabled():
+        with st.sidebar.expander("⏱️ Rerun timings", expanded=True):
+            st.write(f"Total: {record['total_ms']:.1f} ms")
+            st.table({"stage": list(record["stages_ms"]), "ms": list(record["stages_ms"].values())})
+    return record
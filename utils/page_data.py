@@ -0,0 +1,250 @@
+# coding: utf-8
+
+"""Cached per-version aggregates and figures behind each page's chart.
+
+The page scripts and the landing-page warm-up both go through these
+functions, so a view warmed in the background is exactly the one a page
+looks up: same ``st.cache_resource`` entries, same figure-cache keys.
+Spinners are off because the warm-up calls them from a background thread.
+"""
+
+import pandas as pd
+import streamlit as st
+
+from utils.aggregates import CUBE_VERSION, build_who_cube, slice_who_cube
+from utils import config
+from utils.charts import gni_animation, gni_figure, income_group_animation, income_group_figure, who_standards_figure
+from utils.export import filtered_chunks, frame_chunks
+from utils.figure_cache import figure_cache, normalize_filters
+from utils.regression import REGRESSION_VERSION, gni_regressions
+from utils.shared_cache import make_key, shared_cache
+from utils.standards import add_exceedance, eu_standards, who_standards
+from utils.store import open_store
+from utils.sufficient_stats import SufficientStats
+
+# Income groups shown on the Air_Pollution_Impact chart (short labels used in 'ig_label')
+INCOME_GROUPS = ['LM', 'UM', 'H']
+DEATH_MEASURE = 'total_death_attributed_sex_standarized'
+
+# Year of the WHO-standards snapshot shown on its page
+WHO_YEAR = 2023
+WHO_EXCLUDED_COUNTRIES = ['Turkiye']
+
+
+# Air_Pollution_Impact
+
+# Per-(country, year, income group) sums and counts, built once per dataset version
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_stats_index(version, _data):
+    return SufficientStats(_data, [DEATH_MEASURE, 'people_affected'])
+
+
+def air_selection(selected_region, selected_country, income_groups):
+    return normalize_filters(
+        region=['All'] if 'All' in selected_region else selected_region,
+        country=['All'] if 'All' in selected_country else selected_country,
+        income_groups=income_groups
+    )
+
+
+def air_figure(stats, countries, income_groups, selection, version):
+    # On a miss the per-year means are combined from the selected countries' sums
+    return figure_cache.get_or_build(
+        'air_pollution_impact', selection, version,
+        lambda: income_group_figure(stats.means_by_year_label(countries, income_groups, DEATH_MEASURE))
+    )
+
+
+def air_animation_figure(stats, countries, income_groups, selection, version):
+    # Every year's frame comes from the same single pass over the selected countries' sums
+    return figure_cache.get_or_build(
+        'air_pollution_impact_animation', selection, version,
+        lambda: income_group_animation(stats.means_by_year_label(countries, income_groups, DEATH_MEASURE))
+    )
+
+
+def air_exports(data, stats, countries, income_groups):
+    """Chunk sources of the Air_Pollution_Impact exports for a selection."""
+    names = stats.countries[countries]
+    return {
+        'Chart data': lambda: frame_chunks(stats.means_by_year_label(countries, income_groups, DEATH_MEASURE)),
+        'Filtered rows': lambda: filtered_chunks(
+            data, lambda chunk: chunk['country'].isin(names) & chunk['ig_label'].isin(income_groups)
+        ),
+    }
+
+
+# WHO standards
+
+# Aggregate cube, rebuilt only when the dataset version changes; the
+# previous version is kept while sessions may still be using it
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_who_cube(version, _data):
+    if _data.empty:
+        return pd.DataFrame()
+    # Another server process may already have built this version's cube
+    return shared_cache.get_or_compute(make_key('who_cube', CUBE_VERSION, version), lambda: build_who_cube(_data))
+
+
+# Cube of one year and pollutant, scanned from the partitioned store with
+# the filters pushed down so only those partitions and columns are read
+@st.cache_resource(max_entries=16, show_spinner=False)
+def load_store_cube(version, year, pollutant):
+    columns = ['air_pollutant', 'year', 'region', 'country', 'air_pollutant_level', 'exceedance_amount']
+
+    def build():
+        data = open_store("who_standards").scan(columns=columns, year=year, pollutants=[pollutant])
+        return build_who_cube(add_exceedance(data))
+    return shared_cache.get_or_compute(make_key('who_store_cube', CUBE_VERSION, version, year, pollutant), build)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_store_options(version, year):
+    store = open_store("who_standards")
+    return store.distinct('region', year=year), store.partition_values('air_pollutant', year=year)
+
+
+def who_mean_levels(cube, selected_pollutant, regions):
+    """Per-country means of the selection, sorted by distance to the WHO standard."""
+    df_mean_levels = slice_who_cube(cube, selected_pollutant, WHO_YEAR, regions, exclude_countries=WHO_EXCLUDED_COUNTRIES)
+
+    # Difference from the WHO annual standard, precomputed when the data loaded
+    df_mean_levels['difference'] = df_mean_levels['who_2021_annual_margin']
+
+    return df_mean_levels.sort_values('difference', ascending=False)
+
+
+def _rounded(values):
+    # float64 first so the float32 measures serialize without float32 noise; NaN is not valid JSON
+    values = values.astype('float64').round(3)
+    return [None if pd.isna(value) else value for value in values.tolist()]
+
+
+def who_payload(cube):
+    """The WHO_YEAR slice of the cube, dictionary-encoded for client-side filtering.
+
+    Countries, regions and pollutants are sent once as sorted lists and rows
+    refer to them by position; levels and differences are rounded to 3 decimals.
+    """
+    payload = {'year': WHO_YEAR, 'countries': [], 'regions': [], 'pollutants': [], 'rows': {}}
+    if cube.empty or WHO_YEAR not in cube.index.get_level_values('year'):
+        return payload
+
+    rows = cube.xs(WHO_YEAR, level='year').reset_index()
+    rows = rows[~rows['country'].isin(WHO_EXCLUDED_COUNTRIES)]
+    encoded = {}
+    for column, name in (('country', 'countries'), ('region', 'regions'), ('air_pollutant', 'pollutants')):
+        codes, uniques = pd.factorize(rows[column].astype(str), sort=True)
+        encoded[column] = codes.tolist()
+        payload[name] = uniques.tolist()
+
+    payload['rows'] = {
+        'country': encoded['country'],
+        'region': encoded['region'],
+        'pollutant': encoded['air_pollutant'],
+        'level': _rounded(rows['air_pollutant_level']),
+        'difference': _rounded(rows['who_2021_annual_margin']),
+    }
+    payload['who'] = {p: limits['annual'] for p, limits in who_standards.items()}
+    payload['eu'] = {p: limits['annual'] for p, limits in eu_standards.items() if 'annual' in limits}
+    return payload
+
+
+# One payload per dataset version; the version lets the browser skip identical re-renders
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_who_payload(version, _cube):
+    return dict(who_payload(_cube), version=version)
+
+
+# country -> geo_code of a dataset version, read from the store when no frame is given
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_geo_codes(version, _data=None):
+    if _data is None:
+        _data = open_store("who_standards").scan(columns=['country', 'geo_code'], year=WHO_YEAR)
+    pairs = _data[['country', 'geo_code']].astype(str).drop_duplicates('country')
+    return dict(zip(pairs['country'], pairs['geo_code']))
+
+
+def who_map_values(df_mean_levels, geo_codes):
+    """[level, difference from the WHO standard] per geo_code: all a map rerun sends."""
+    codes = df_mean_levels['country'].map(geo_codes)
+    levels = _rounded(df_mean_levels['air_pollutant_level'])
+    differences = _rounded(df_mean_levels['difference'])
+    return {
+        code: [level, difference]
+        for code, level, difference in zip(codes, levels, differences)
+        if isinstance(code, str)
+    }
+
+
+def _without_excluded(chunk):
+    return ~chunk['country'].isin(WHO_EXCLUDED_COUNTRIES)
+
+
+def who_exports(df_mean_levels, selected_pollutant, regions, data=None, store=None):
+    """Chunk sources of the WHO page exports: the chart's means, and the source rows of every year.
+
+    The source rows are scanned batch by batch from ``store`` when it is
+    given, otherwise filtered slice by slice from ``data``.
+    """
+    if store is not None:
+        def source_rows():
+            batches = store.scan_batches(
+                pollutants=[selected_pollutant], regions=regions, batch_rows=config.EXPORT_CHUNK_ROWS
+            )
+            return (batch[_without_excluded(batch)] for batch in batches)
+    else:
+        def source_rows():
+            return filtered_chunks(
+                data,
+                lambda chunk: (
+                    (chunk['air_pollutant'] == selected_pollutant)
+                    & (chunk['region'].isin(regions) if regions is not None else True)
+                    & _without_excluded(chunk)
+                ),
+            )
+    return {
+        'Chart data': lambda: frame_chunks(df_mean_levels),
+        'Source rows, all years': source_rows,
+    }
+
+
+def who_selection(regions, selected_pollutant):
+    return normalize_filters(region=regions or ['All'], pollutant=selected_pollutant, year=WHO_YEAR)
+
+
+def who_figure(df_mean_levels, selected_pollutant, selection, version):
+    return figure_cache.get_or_build(
+        'who_standards_countries', selection, version,
+        lambda: who_standards_figure(df_mean_levels, who_standards, eu_standards, selected_pollutant)
+    )
+
+
+# GNI vs. air pollution
+
+# Regressions for every (pollutant, year, region, income group), computed once per dataset version
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_gni_regressions(version, _data):
+    if _data.empty:
+        return pd.DataFrame()
+    # Another server process may already have computed this version's fits
+    return shared_cache.get_or_compute(make_key('gni_regressions', REGRESSION_VERSION, version), lambda: gni_regressions(_data))
+
+
+def gni_selection(selected_pollutant, selected_year, selected_region):
+    return normalize_filters(pollutant=selected_pollutant, year=selected_year, region=selected_region)
+
+
+def gni_view_figure(df, group_fits, selected_pollutant, selected_year, selected_region, version):
+    return figure_cache.get_or_build(
+        'gni_vs_air_pollution', gni_selection(selected_pollutant, selected_year, selected_region), version,
+        lambda: gni_figure(df, group_fits, selected_pollutant, selected_year, selected_region)
+    )
+
+
+def gni_animation_figure(df, fits, selected_pollutant, selected_year, selected_region, version):
+    # The selected year is the frame the animation opens on
+    return figure_cache.get_or_build(
+        'gni_vs_air_pollution_animation', gni_selection(selected_pollutant, selected_year, selected_region), version,
+        lambda: gni_animation(df, fits, selected_pollutant, selected_region, selected_year)
+    )
@@ -0,0 +1,49 @@
+# coding: utf-8
+
+"""plotly.js for the custom components, served from their own directories.
+
+Streamlit only serves a component's files from the directory it was
+declared with (symlinks leading outside it are refused), so the
+``plotly.min.js`` shipped in the installed plotly package is copied next to
+each component as ``plotly-<version>.min.js`` the first time it is needed.
+The components then work without internet access and under a CSP limited to
+the app's own origin, and since Streamlit serves non-HTML component files
+with ``Cache-Control: public`` and the name changes with the plotly version,
+browsers download it once.
+"""
+
+import importlib.util
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from utils.lazy_imports import lazy_import
+
+offline = lazy_import("plotly.offline")
+
+_lock = threading.Lock()
+
+
+def _bundled_path():
+    # Located without importing plotly itself
+    package = importlib.util.find_spec("plotly").submodule_search_locations[0]
+    return Path(package) / "package_data" / "plotly.min.js"
+
+
+def plotly_js(component_dir):
+    """Path of the bundled plotly.js relative to ``component_dir``, copying it there if missing."""
+    component_dir = Path(component_dir)
+    name = f"plotly-{offline.get_plotlyjs_version()}.min.js"
+    target = component_dir / name
+    if not target.exists():
+        with _lock:
+            if not target.exists():
+                tmp_target = target.with_name(f".{name}.{os.getpid()}.tmp")
+                shutil.copyfile(_bundled_path(), tmp_target)
+                os.replace(tmp_target, target)
+                # Drop the copies of previously installed versions
+                for stale in component_dir.glob("plotly-*.min.js"):
+                    if stale != target:
+                        stale.unlink(missing_ok=True)
+    return name
@@ -0,0 +1,165 @@
+# coding: utf-8
+
+"""On-demand profiling of single page reruns.
+
+An operator profiles one session by opening a page with ``?profile=sample``
+or ``?profile=cprofile`` and ``&profile_token=`` set to
+``CLIMATE_PROFILE_TOKEN`` (the query parameters are ignored while no token is
+configured, so visitors cannot turn profiling on), or every session of the
+pages listed in ``CLIMATE_PROFILE_PAGES``. ``metrics.page_rerun`` starts a
+capture and saves it to ``config.PROFILES_DIR``, so every rerun
+(fragment-only reruns included) gets its own capture named
+``<time>-<page>-<kind>-<session>``:
+
+- ``.collapsed``: stacks of the script thread sampled every
+  ``PROFILE_INTERVAL`` seconds, one ``frame;frame;... count`` line per
+  distinct stack, ready for flamegraph.pl, speedscope or inferno;
+- ``.pstats``: in ``cprofile`` mode, deterministic cProfile statistics for
+  ``pstats`` or snakeviz;
+- ``.json``: the rerun's metrics record (page, selection, stage timings)
+  plus the profiling mode and sample count.
+
+Sampling only reads the other thread's frames, so its overhead stays low
+enough for production; cProfile slows the profiled rerun down.
+"""
+
+import cProfile
+import hmac
+import json
+import logging
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+import streamlit as st
+
+from utils import config
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sample", "cprofile")
+
+_prune_lock = threading.Lock()
+
+
+def _operator():
+    # Only sessions presenting the configured token may request a profile
+    token = st.query_params.get("profile_token", "")
+    return bool(config.PROFILE_TOKEN) and hmac.compare_digest(token, config.PROFILE_TOKEN)
+
+
+def profile_mode(page):
+    """Profiling mode requested for this rerun of ``page``, or ``None``."""
+    requested = st.query_params.get("profile")
+    if requested in MODES and _operator():
+        return requested
+    if page in config.PROFILE_PAGES:
+        return config.PROFILE_MODE
+    return None
+
+
+def _frame_name(code):
+    path = code.co_filename
+    if path.startswith(str(config.ROOT_DIR)):
+        path = path[len(str(config.ROOT_DIR)) + 1:]
+    elif "site-packages" in path:
+        path = path.split("site-packages", 1)[1].lstrip("/\\")
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Counts the distinct stacks of one thread, sampled at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def finish(self):
+        self._done.set()
+        self.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Capture:
+    """One rerun being profiled on the current script thread."""
+
+    def __init__(self, page, mode):
+        self.page = page
+        self.mode = mode
+        self.started = datetime.now(timezone.utc)
+        self.sampler = StackSampler(threading.get_ident(), config.PROFILE_INTERVAL)
+        self.profiler = None
+        if mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler (e.g. a concurrent capture on 3.12+) is active
+                logger.warning("cProfile unavailable for %s; sampling only", page)
+                self.profiler = None
+        self.sampler.start()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.sampler.finish()
+
+    def save(self, record):
+        """Write the capture with the rerun's metrics ``record``; return the file stem."""
+        session = re.sub(r"[^\w-]", "", record.get("session_id") or "nosession")[:8]
+        stem = f"{self.started:%Y%m%dT%H%M%S%f}-{self.page}-{record.get('kind', 'script')}-{session}"
+        config.PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        base = config.PROFILES_DIR / stem
+
+        files = [f"{stem}.collapsed"]
+        base.with_suffix(".collapsed").write_text(self.sampler.collapsed(), encoding="utf-8")
+        if self.profiler is not None:
+            self.profiler.dump_stats(base.with_suffix(".pstats"))
+            files.append(f"{stem}.pstats")
+
+        metadata = dict(
+            record,
+            profile=dict(
+                mode=self.mode if self.profiler is not None else "sample",
+                interval_s=config.PROFILE_INTERVAL,
+                samples=self.sampler.samples,
+                files=files,
+            ),
+        )
+        base.with_suffix(".json").write_text(json.dumps(metadata, default=str, indent=2), encoding="utf-8")
+        _prune()
+        return stem
+
+
+def _prune():
+    # Captures share a stem, so dropping the oldest metadata files drops whole captures
+    with _prune_lock:
+        captures = sorted(config.PROFILES_DIR.glob("*.json"))
+        for stale in captures[:max(len(captures) - config.PROFILE_MAX_CAPTURES, 0)]:
+            for path in config.PROFILES_DIR.glob(f"{stale.stem}.*"):
+                path.unlink(missing_ok=True)
+
+
+def start_capture(page):
+    """Start profiling this rerun of ``page`` if it was requested."""
+    mode = profile_mode(page)
+    return Capture(page, mode) if mode is not None else None
@@ -0,0 +1,127 @@
+# coding: utf-8
+
+"""Background refresh of the datasets from a configurable source.
+
+A daemon thread polls ``config.REFRESH_SOURCE`` for every dataset. HTTP(S)
+sources are fetched conditionally with ETag / If-Modified-Since; a local
+directory or ``file://`` URL (e.g. a stand-in file server for tests) is
+compared by checksum. New data is parsed and typed on the refresher thread,
+written to ``config.REFRESHED_DIR`` and the Parquet cache, then swapped into
+the registry, so no rerun ever waits on the download. A dataset that also has
+a partitioned store (which the pages read instead of the registry) gets its
+store rebuilt from the new CSV first, so both move to the new version
+together. Datasets this process has neither loaded nor stored are not
+polled, so refreshing never loads a dataset no page uses.
+"""
+
+import io
+import logging
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+
+from utils import config
+from utils.data_loader import DATASETS, content_hash, store_dataset
+from utils.registry import datasets
+from utils.schema import apply_schema
+from utils.store import build_store, open_store
+
+logger = logging.getLogger(__name__)
+
+
+def fetch(url, etag=None, last_modified=None, timeout=30):
+    """Fetch ``url`` unless unchanged.
+
+    Returns ``(content, etag, last_modified)``; ``content`` is ``None`` when an
+    HTTP server answers 304 Not Modified.
+    """
+    if not url.startswith(("http://", "https://")):
+        path = Path(url[len("file://"):] if url.startswith("file://") else url)
+        return path.read_bytes(), None, None
+
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return None, etag, last_modified
+        raise
+
+
+class Refresher(threading.Thread):
+    """Daemon thread polling ``source`` every ``interval`` seconds."""
+
+    def __init__(self, source, interval):
+        super().__init__(name="dataset-refresher", daemon=True)
+        self.source = source.rstrip("/") + "/"
+        self.interval = interval
+        self._validators = {}
+        self._stop_event = threading.Event()
+
+    def refresh(self, name):
+        """Check one dataset; returns the new version if it was swapped in."""
+        current, store = datasets.loaded(name), open_store(name)
+        if current is None and store is None:
+            # Not in use yet; the first poll after it is loaded picks it up
+            return None
+
+        etag, last_modified = self._validators.get(name, (None, None))
+        content, etag, last_modified = fetch(self.source + DATASETS[name], etag, last_modified)
+        self._validators[name] = (etag, last_modified)
+        if content is None:
+            return None
+
+        version = content_hash(content)
+        if all(used.version == version for used in (current, store) if used is not None):
+            return None
+
+        frame = apply_schema(pd.read_csv(io.BytesIO(content)), name)
+        store_dataset(name, content, frame)
+        if store is not None:
+            build_store(name)
+        if current is not None:
+            datasets.swap(name, version, frame)
+        logger.info("Dataset %s refreshed to version %s", name, version)
+        return version
+
+    def refresh_all(self):
+        for name in DATASETS:
+            try:
+                self.refresh(name)
+            except Exception:
+                logger.exception("Refreshing dataset %s failed", name)
+
+    def run(self):
+        # Poll once at start, then every interval
+        while True:
+            self.refresh_all()
+            if self._stop_event.wait(self.interval):
+                break
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_refresher = None
+_start_lock = threading.Lock()
+
+
+def start_refresher():
+    """Start the process-wide refresher once, if a refresh source is configured."""
+    global _refresher
+    if not config.REFRESH_SOURCE:
+        return None
+    with _start_lock:
+        if _refresher is None:
+            _refresher = Refresher(config.REFRESH_SOURCE, config.REFRESH_INTERVAL)
+            _refresher.start()
+    return _refresher
@@ -0,0 +1,89 @@
+# coding: utf-8
+
+"""Process-wide registry of the current version of every dataset.
+
+Pages read an immutable ``Dataset`` snapshot once per rerun, so the frame and
+the version used in cache keys always match. ``swap`` replaces a snapshot
+atomically; readers holding the old snapshot finish their rerun with it.
+"""
+
+import threading
+from collections import namedtuple
+
+from utils.data_loader import load_versioned
+from utils.figure_cache import figure_cache
+from utils.standards import add_exceedance
+
+Dataset = namedtuple("Dataset", ["name", "version", "frame"])
+
+# Columns derived once per loaded version, before the snapshot is published
+DERIVED = {
+    "who_standards": add_exceedance,
+    "pollution_by_industry": add_exceedance,
+}
+
+
+def prepare(name, frame):
+    derive = DERIVED.get(name)
+    return derive(frame) if derive is not None else frame
+
+
+class DatasetRegistry:
+
+    def __init__(self):
+        self._current = {}
+        self._listeners = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, name):
+        """Current snapshot of ``name``, loading it on first access."""
+        dataset = self._current.get(name)
+        if dataset is not None:
+            return dataset
+
+        # Concurrent first accesses share a single load
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            dataset = self._current.get(name)
+            if dataset is None:
+                frame, version = load_versioned(name)
+                dataset = Dataset(name, version, prepare(name, frame))
+                self._current[name] = dataset
+        return dataset
+
+    def loaded(self, name):
+        """Current snapshot of ``name``, or ``None`` if it was never loaded; never loads it."""
+        return self._current.get(name)
+
+    def swap(self, name, version, frame):
+        """Publish a new version of ``name`` and notify listeners."""
+        dataset = Dataset(name, version, prepare(name, frame))
+        with self._lock:
+            old = self._current.get(name)
+            self._current[name] = dataset
+            listeners = list(self._listeners.values())
+        old_version = old.version if old is not None else None
+        for listener in listeners:
+            listener(name, old_version, version)
+
+    def clear(self):
+        """Forget every loaded snapshot; the next ``get`` reloads from disk."""
+        with self._lock:
+            self._current.clear()
+
+    def subscribe(self, key, listener):
+        """Call ``listener(name, old_version, new_version)`` after every swap.
+
+        Subscribing again with the same ``key`` replaces the listener, so page
+        scripts can subscribe on every rerun.
+        """
+        with self._lock:
+            self._listeners[key] = listener
+
+
+datasets = DatasetRegistry()
+
+# Figures built from a replaced version can never be requested again
+datasets.subscribe("figure_cache", lambda name, old, new: figure_cache.invalidate(old))
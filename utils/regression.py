@@ -0,0 +1,99 @@
+# coding: utf-8
+
+"""Batched population-weighted regressions of pollutant level on GNI.
+
+Every group's fit comes from the same weighted sums, accumulated for all
+groups at once with ``np.bincount`` over the group codes: the group means
+first, then the second moments about them. That is two passes over the data
+instead of one ``scipy.stats`` call per group.
+"""
+
+import numpy as np
+import pandas as pd
+
+GNI_GROUP_KEYS = ["air_pollutant", "year", "region", "ig_label"]
+
+# Bump when the fits' columns or method change; shared-cache keys include it
+REGRESSION_VERSION = 2
+
+# Groups with fewer points than this get NaN fits
+MIN_POINTS = 3
+
+# A group whose variance of x (or y) is below this fraction of its mean
+# square is constant in x (or y) up to rounding, and gets NaN fits
+RELATIVE_VARIANCE_TOLERANCE = 1e-12
+
+
+def weighted_regressions(data, keys, x, y, weight):
+    """Weighted least-squares fit of ``y`` on ``x`` for every group of ``keys``.
+
+    Returns a frame indexed by ``keys`` with ``n``, ``total_weight``,
+    ``slope``, ``intercept``, ``r`` and ``r2``.
+    """
+    grouped = data.groupby(keys, observed=True, sort=True)
+    index = grouped.size().index
+    codes = grouped.ngroup().to_numpy()
+    k = len(index)
+
+    xs = data[x].to_numpy(dtype="float64")
+    ys = data[y].to_numpy(dtype="float64")
+    ws = data[weight].to_numpy(dtype="float64")
+
+    # A row missing x, y or its weight is left out of its group's fit; one NaN
+    # would otherwise turn every group's sums (and the offsets) into NaN
+    valid = np.isfinite(xs) & np.isfinite(ys) & np.isfinite(ws)
+    codes, xs, ys, ws = codes[valid], xs[valid], ys[valid], ws[valid]
+
+    def total(values):
+        return np.bincount(codes, weights=values, minlength=k)
+
+    n = np.bincount(codes, minlength=k)
+    w = total(ws)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Groups left without valid rows get NaN moments
+        mean_x = total(ws * xs) / w
+        mean_y = total(ws * ys) / w
+
+        # Second moments about each group's own means: no cancellation
+        # between E[x²] and E[x]², so a constant group comes out (nearly) 0
+        dx = xs - mean_x[codes]
+        dy = ys - mean_y[codes]
+        var_x = total(ws * dx * dx) / w
+        var_y = total(ws * dy * dy) / w
+        cov = total(ws * dx * dy) / w
+
+        slope = cov / var_x
+        r = cov / np.sqrt(var_x * var_y)
+
+        constant_x = var_x <= RELATIVE_VARIANCE_TOLERANCE * (total(ws * xs * xs) / w + np.finfo("float64").tiny)
+        constant_y = var_y <= RELATIVE_VARIANCE_TOLERANCE * (total(ws * ys * ys) / w + np.finfo("float64").tiny)
+    too_small = (n < MIN_POINTS) | constant_x
+    slope[too_small] = np.nan
+    r[too_small | constant_y] = np.nan
+
+    intercept = mean_y - slope * mean_x
+
+    return pd.DataFrame(
+        {"n": n, "total_weight": w, "slope": slope, "intercept": intercept, "r": r, "r2": r ** 2},
+        index=index,
+    )
+
+
+def gni_regressions(data):
+    """Fits of pollutant level on GNI per capita, weighted by population.
+
+    Groups are (pollutant, year, region, income group), plus a region of
+    ``"All"`` covering every region, so any page selection is an index lookup.
+    """
+    columns = dict(x="GNI_per_capita", y="air_pollutant_level", weight="population")
+    by_region = weighted_regressions(data, GNI_GROUP_KEYS, **columns)
+
+    rolled_up_keys = [key for key in GNI_GROUP_KEYS if key != "region"]
+    all_regions = weighted_regressions(data, rolled_up_keys, **columns)
+    all_regions = all_regions.assign(region="All").set_index("region", append=True)
+    all_regions = all_regions.reorder_levels(GNI_GROUP_KEYS)
+
+    # Plain-string keys so "All" can sit next to the region categories
+    results = pd.concat([by_region.reset_index(), all_regions.reset_index()])
+    results = results.astype({key: str for key in GNI_GROUP_KEYS if key != "year"})
+    return results.set_index(GNI_GROUP_KEYS).sort_index()
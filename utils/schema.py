@@ -0,0 +1,99 @@
+# coding: utf-8
+
+"""Declared column types for every dataset in dataset/.
+
+Dimensions load as categoricals, years as int16, counts as int32 and
+measures as float32. Counts stay integral because float32 cannot represent
+populations above ~16.7 million exactly.
+"""
+
+import pandas as pd
+
+# Bump when a schema changes so cached Parquet copies are rebuilt
+SCHEMA_VERSION = 1
+
+CATEGORY = "category"
+
+SCHEMAS = {
+    "global_burden": {
+        "geo_code": CATEGORY,
+        "region": CATEGORY,
+        "ig_label": CATEGORY,
+        "country": CATEGORY,
+        "year": "int16",
+        "num_deaths": "int32",
+        "population": "int32",
+        "GNI_per_capita_wb_Atlas_USD_EUR": "float32",
+        "people_affected": "int32",
+        "total_death_attributed_sex_standarized": "float32",
+    },
+    "who_standards": {
+        "air_pollutant": CATEGORY,
+        "unit_air_poll_lvl": CATEGORY,
+        "air_pollutant_level": "float32",
+        "year": "int16",
+        "country": CATEGORY,
+        "region": CATEGORY,
+        "AQI_Index": "float32",
+        "geo_code": CATEGORY,
+        "exceedance_amount": "float32",
+    },
+    "pollution_by_industry": {
+        "air_pollutant": CATEGORY,
+        "unit_air_poll_lvl": CATEGORY,
+        "air_pollutant_level": "float32",
+        "air_qual_stat_type": CATEGORY,
+        "year": "int16",
+        "country": CATEGORY,
+        "region": CATEGORY,
+        "AQI_Index": "float32",
+        "geo_code": CATEGORY,
+        "exceedance_amount": "float32",
+    },
+    "air_quality_gni": {
+        "geo_code": CATEGORY,
+        "country": CATEGORY,
+        "region": CATEGORY,
+        "ig_label": CATEGORY,
+        "air_pollutant": CATEGORY,
+        "unit_air_poll_lvl": CATEGORY,
+        "year": "int16",
+        "GNI_per_capita": "float32",
+        "population": "int32",
+        "AQI_Index": "float32",
+        "air_pollutant_level": "float32",
+    },
+}
+
+
+def _to_numeric(values, column, dtype):
+    numeric = pd.to_numeric(values, errors="coerce")
+    invalid = numeric.isna() & values.notna()
+    if invalid.any():
+        raise ValueError(f"Column '{column}' has {invalid.sum()} non-numeric values")
+    if dtype.startswith("int") and numeric.isna().any():
+        raise ValueError(f"Column '{column}' has missing values but is declared {dtype}")
+    return numeric.astype(dtype)
+
+
+def apply_schema(data, name):
+    """Return ``data`` with every column cast to its declared type.
+
+    Raises ``ValueError`` when a declared column is missing or a numeric
+    column holds values that cannot be parsed.
+    """
+    schema = SCHEMAS[name]
+    missing = [column for column in schema if column not in data.columns]
+    if missing:
+        raise ValueError(f"Dataset '{name}' is missing columns: {', '.join(missing)}")
+
+    typed = {}
+    for column in data.columns:
+        dtype = schema.get(column)
+        if dtype is None:
+            typed[column] = data[column]
+        elif dtype == CATEGORY:
+            typed[column] = data[column].astype(CATEGORY)
+        else:
+            typed[column] = _to_numeric(data[column], column, dtype)
+    return pd.DataFrame(typed)
@@ -0,0 +1,185 @@
+# coding: utf-8
+
+"""Disk-backed result cache shared by every server process on a host.
+
+Results (figure JSON, pickled aggregates) are stored in one SQLite database
+in WAL mode, keyed by a hash of (cache format, dataset schema version,
+namespace, code version, normalized filters, dataset version), so results
+written by an older deploy are never read back. Writers serialize on
+SQLite's lock with a busy timeout, and once the stored bytes exceed the
+budget the least recently used rows are evicted in the same transaction. A
+result computed by one replica is reused by the others.
+
+Reads never write: access times of hits are collected in memory and written
+in batches, inside the next ``put`` or at most every ``TOUCH_INTERVAL``
+seconds, without waiting for the lock.
+"""
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+
+from utils import config
+from utils.schema import SCHEMA_VERSION
+
+# Bump when the way results are stored changes (pickle layout, figure JSON)
+CACHE_FORMAT = 1
+
+# Seconds between best-effort writes of the collected access times
+TOUCH_INTERVAL = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+"""
+
+
+def make_key(*parts):
+    """Stable key for any tuple of reprs-stable values.
+
+    Callers include the version constant of the code that builds the result;
+    the cache format and dataset schema version are added here.
+    """
+    return hashlib.sha256(repr((CACHE_FORMAT, SCHEMA_VERSION) + parts).encode("utf-8")).hexdigest()
+
+
+class SharedCache:
+    """Size-bounded LRU cache in a SQLite file."""
+
+    def __init__(self, path=config.SHARED_CACHE_PATH, max_bytes=config.SHARED_CACHE_BYTES, timeout=5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._touched = {}
+        self._touched_lock = threading.Lock()
+        self._last_touch = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between session threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Stored bytes for ``key``, or ``None``."""
+        if not self.enabled:
+            return None
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._touched_lock:
+            self._touched[key] = time.time()
+            due = time.monotonic() - self._last_touch >= TOUCH_INTERVAL
+        if due:
+            self._flush_touches(connection)
+        return row[0]
+
+    def _take_touches(self):
+        with self._touched_lock:
+            touched, self._touched = self._touched, {}
+            self._last_touch = time.monotonic()
+        return [(accessed, key) for key, accessed in touched.items()]
+
+    def _write_touches(self, connection, touches):
+        connection.executemany("UPDATE results SET last_access = MAX(last_access, ?) WHERE key = ?", touches)
+
+    def _flush_touches(self, connection):
+        """Write the collected access times unless another process holds the lock."""
+        touches = self._take_touches()
+        if not touches:
+            return
+        connection.execute("PRAGMA busy_timeout = 0")
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            self._write_touches(connection, touches)
+            connection.execute("COMMIT")
+        except sqlite3.OperationalError:
+            # Busy; access times only affect eviction order, so these are dropped
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+        finally:
+            connection.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+
+    def put(self, key, value):
+        """Store ``value`` bytes under ``key`` and evict down to the size budget."""
+        if not self.enabled or len(value) > self.max_bytes:
+            return
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            # The write lock is held anyway; record the pending access times with it
+            self._write_touches(connection, self._take_touches())
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(connection, total - self.max_bytes)
+            connection.execute("COMMIT")
+        except sqlite3.OperationalError:
+            # Could not get the lock in time; this replica simply does not share the result
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+
+    @staticmethod
+    def _evict(connection, excess):
+        freed = 0
+        rows = connection.execute("SELECT key, size FROM results ORDER BY last_access")
+        victims = []
+        for key, size in rows:
+            if freed >= excess:
+                break
+            victims.append((key,))
+            freed += size
+        connection.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def get_or_compute(self, key, compute, dumps=pickle.dumps, loads=pickle.loads):
+        """Shared result for ``key``, computing and storing it on a miss."""
+        payload = self.get(key)
+        if payload is not None:
+            return loads(payload)
+        value = compute()
+        self.put(key, dumps(value))
+        return value
+
+    def clear(self):
+        """Drop every stored result, for every process sharing the file."""
+        if not self.enabled:
+            return
+        self._take_touches()
+        connection = self._connection()
+        try:
+            connection.execute("DELETE FROM results")
+        except sqlite3.OperationalError:
+            pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# One handle per process; every process opens the same database file
+shared_cache = SharedCache()
@@ -0,0 +1,77 @@
+# coding: utf-8
+
+"""WHO and EU air-quality limits and a vectorized exceedance engine.
+
+All limits live in one table aligned by pollutant, so the margin of every
+row against every standard is computed with a single NumPy broadcast when a
+dataset loads. Pages read the resulting ``<standard>_margin`` and
+``<standard>_exceedance`` columns instead of redoing the arithmetic.
+"""
+
+import numpy as np
+import pandas as pd
+
+# WHO Standards
+who_standards = {
+    'PM10': {'annual': 15},
+    'PM2.5': {'annual': 5},
+    'NO2': {'annual': 10}
+}
+
+# EU Standards
+eu_standards = {
+    'PM10': {'annual': 40, '24_hours': 50},
+    'PM2.5': {'annual': 25, 'stage2_annual': 20},
+    'NO2': {'annual': 40, '1_hour': 200}
+}
+
+# Standard name -> (source dict, key in that dict)
+STANDARDS = {
+    "who_2021_annual": (who_standards, "annual"),
+    "eu_2011_annual": (eu_standards, "annual"),
+    "eu_2011_stage2_annual": (eu_standards, "stage2_annual"),
+    "eu_2011_24_hours": (eu_standards, "24_hours"),
+    "eu_2011_1_hour": (eu_standards, "1_hour"),
+}
+
+# Pollutant x standard table of limits in μg/m³, NaN where a standard has no limit
+LIMITS = pd.DataFrame(
+    {
+        name: {pollutant: limits.get(key, np.nan) for pollutant, limits in source.items()}
+        for name, (source, key) in STANDARDS.items()
+    },
+    dtype="float32",
+)
+
+MARGIN_COLUMNS = [f"{name}_margin" for name in STANDARDS]
+EXCEEDANCE_COLUMNS = [f"{name}_exceedance" for name in STANDARDS]
+
+
+def _limit_rows(pollutants):
+    """Row of ``LIMITS`` for each pollutant value, -1 when it has no limits."""
+    if isinstance(pollutants.dtype, pd.CategoricalDtype):
+        # Resolve each category once, then index by the integer codes
+        lookup = np.append(LIMITS.index.get_indexer(pollutants.cat.categories), -1)
+        return lookup[pollutants.cat.codes.to_numpy()]
+    return LIMITS.index.get_indexer(pollutants)
+
+
+def add_exceedance(data, level_column="air_pollutant_level", pollutant_column="air_pollutant"):
+    """Return ``data`` with margin and exceedance columns for every standard.
+
+    The margin is the level minus the limit; the exceedance is the positive
+    part of the margin. Both are NaN where the pollutant has no such limit.
+    """
+    # An extra all-NaN row absorbs pollutants without limits (row index -1)
+    table = np.vstack([LIMITS.to_numpy(), np.full(len(STANDARDS), np.nan, dtype="float32")])
+    limits = table[_limit_rows(data[pollutant_column])]
+    levels = data[level_column].to_numpy(dtype="float32")
+
+    margin = levels[:, None] - limits
+    exceedance = np.maximum(margin, 0)
+
+    columns = {}
+    for i, (margin_column, exceedance_column) in enumerate(zip(MARGIN_COLUMNS, EXCEEDANCE_COLUMNS)):
+        columns[margin_column] = margin[:, i]
+        columns[exceedance_column] = exceedance[:, i]
+    return data.assign(**columns)
@@ -0,0 +1,232 @@
+# coding: utf-8
+
+"""Year/pollutant-partitioned, memory-mapped Arrow IPC store.
+
+Multi-year archives are written as one Arrow IPC file per
+``year=<y>/air_pollutant=<p>`` partition. Scans open the files memory-mapped
+and push the page filters down: year and pollutant prune whole partitions,
+region is evaluated inside the scan, and only the requested columns are
+paged in, so resident memory follows the query rather than the archive.
+
+The archive is read and typed in chunks while it is written, so building the
+store never holds more than one chunk either. Every version is written to
+its own directory and published by atomically replacing the ``CURRENT``
+pointer file; readers see either the old or the new version, never none.
+
+Usage:
+    python -m utils.store who_standards [--source path/to/archive.csv]
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from utils import config
+from utils.data_loader import dataset_path, dataset_version, file_hash
+from utils.schema import apply_schema
+
+PARTITION_SCHEMA = pa.schema([("year", pa.int16()), ("air_pollutant", pa.string())])
+
+# Name of the published version, replaced atomically on every write
+CURRENT_FILE = "CURRENT"
+
+# Version directories kept on disk: the current one and the one before it,
+# which readers that opened it before a swap may still be scanning
+KEEP_VERSIONS = 2
+
+# Archive rows read, typed and written per chunk
+CHUNK_ROWS = 100_000
+
+
+def _to_frame(table):
+    # Dimensions are stored as plain strings; type them back as categoricals
+    # with sorted categories, as apply_schema does
+    strings = [field.name for field in table.schema if pa.types.is_string(field.type)]
+    return table.to_pandas().astype({column: "category" for column in strings})
+
+
+class PartitionedStore:
+    """Read side of one version directory written by ``write_store``."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.version = self.root.name
+        self._dataset = ds.dataset(
+            str(self.root),
+            format="ipc",
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+            filesystem=fs.LocalFileSystem(use_mmap=True),
+            exclude_invalid_files=True,
+        )
+
+    @staticmethod
+    def _filter(year=None, pollutants=None, regions=None):
+        expression = None
+        for condition in (
+            None if year is None else ds.field("year") == year,
+            None if pollutants is None else ds.field("air_pollutant").isin(list(pollutants)),
+            None if regions is None else ds.field("region").isin(list(regions)),
+        ):
+            if condition is not None:
+                expression = condition if expression is None else expression & condition
+        return expression
+
+    def scan(self, columns=None, year=None, pollutants=None, regions=None):
+        """Rows matching every given predicate, as a pandas frame."""
+        table = self._dataset.to_table(columns=columns, filter=self._filter(year, pollutants, regions))
+        return _to_frame(table)
+
+    def scan_batches(self, columns=None, year=None, pollutants=None, regions=None, batch_rows=None):
+        """Rows matching every given predicate, as pandas frames of at most ``batch_rows`` rows.
+
+        Only one batch is in memory at a time, however many years match.
+        """
+        options = {} if batch_rows is None else {"batch_size": batch_rows}
+        batches = self._dataset.to_batches(columns=columns, filter=self._filter(year, pollutants, regions), **options)
+        for batch in batches:
+            if batch.num_rows:
+                yield _to_frame(batch)
+
+    def distinct(self, column, **filters):
+        """Sorted distinct values of one column, reading only that column."""
+        return sorted(self.scan(columns=[column], **filters)[column].dropna().unique().tolist())
+
+    def partition_values(self, key, **filters):
+        """Distinct partition key values, from the file paths alone."""
+        fragments = self._dataset.get_fragments(filter=self._filter(**filters))
+        values = set()
+        for fragment in fragments:
+            values.add(ds.get_partition_keys(fragment.partition_expression)[key])
+        return sorted(values)
+
+
+def _tmp_name(name):
+    return f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _plain_type(arrow_type):
+    # Chunks are categorized independently, so their dictionaries differ; the
+    # IPC file format cannot replace a dictionary, hence plain values
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    return pa.string() if pa.types.is_null(arrow_type) else arrow_type
+
+
+def _record_batches(chunks):
+    """Schema and record batches of an iterable of typed frames.
+
+    The schema comes from the first chunk; every chunk is cast to it.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return None, iter(())
+    table = pa.Table.from_pandas(first, preserve_index=False)
+    schema = pa.schema([pa.field(field.name, _plain_type(field.type)) for field in table.schema])
+
+    def batches():
+        for chunk in itertools.chain([first], chunks):
+            yield from pa.Table.from_pandas(chunk, preserve_index=False).cast(schema).to_batches()
+    return schema, batches()
+
+
+def _prune_versions(root, current):
+    versions = [path for path in root.iterdir() if path.is_dir() and not path.name.startswith(".")]
+    versions.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    kept = {current}
+    for path in versions:
+        if len(kept) < KEEP_VERSIONS:
+            kept.add(path.name)
+        elif path.name not in kept:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def write_store(chunks, root, version):
+    """Write typed frames ``chunks`` partitioned by year and pollutant as ``version`` of ``root``.
+
+    ``chunks`` may be a single frame or any iterable of frames with the same
+    columns; only one chunk is converted at a time.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    target = root / version
+    if not target.exists():
+        tmp_target = root / _tmp_name(version)
+        shutil.rmtree(tmp_target, ignore_errors=True)
+        tmp_target.mkdir()
+        schema, batches = _record_batches(chunks)
+        if schema is not None:
+            ds.write_dataset(
+                batches,
+                str(tmp_target),
+                schema=schema,
+                format="ipc",
+                partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+                existing_data_behavior="overwrite_or_ignore",
+            )
+        try:
+            tmp_target.rename(target)
+        except OSError:
+            # Another process published the same version meanwhile
+            shutil.rmtree(tmp_target, ignore_errors=True)
+
+    # Publish: readers switch to the new directory with the pointer file
+    pointer = root / _tmp_name(CURRENT_FILE)
+    pointer.write_text(version)
+    os.replace(pointer, root / CURRENT_FILE)
+    _prune_versions(root, version)
+
+
+def store_path(name):
+    return config.STORE_DIR / name
+
+
+# root -> opened store, reused until the store's version file changes
+_stores = {}
+
+
+def open_store(name):
+    """The partitioned store for ``name``, or ``None`` if it was never built."""
+    root = store_path(name)
+    try:
+        version = (root / CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        return None
+    store = _stores.get(root)
+    if store is None or store.version != version:
+        store = _stores[root] = PartitionedStore(root / version)
+    return store
+
+
+def build_store(name, source=None):
+    """Build the store for ``name`` from the CSV ``source`` (default: its current CSV, see ``dataset_path``).
+
+    The CSV is read, typed and written ``CHUNK_ROWS`` rows at a time.
+    """
+    if source is None:
+        source, version = dataset_path(name), dataset_version(name)
+    else:
+        version = file_hash(source)
+    chunks = (apply_schema(chunk, name) for chunk in pd.read_csv(source, chunksize=CHUNK_ROWS))
+    write_store(chunks, store_path(name), version)
+    return open_store(name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a year/pollutant-partitioned store for a dataset.")
+    parser.add_argument("name", help="dataset name, e.g. who_standards")
+    parser.add_argument("--source", default=None, help="CSV to store instead of the dataset's current one")
+    args = parser.parse_args()
+    store = build_store(args.name, args.source)
+    print(f"Stored {args.name} version {store.version} in {store.root}")
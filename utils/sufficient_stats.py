@@ -0,0 +1,89 @@
+# coding: utf-8
+
+"""Additive per-(country, year, income group) sums and counts.
+
+Means over any region/country selection are ratios of sums of these cells,
+so a selection is answered by adding up the rows of the selected countries
+(O(selected countries x years x income groups)) instead of filtering and
+grouping the full frame on every rerun.
+"""
+
+import numpy as np
+import pandas as pd
+
+STATS_KEYS = ["country", "year", "ig_label"]
+
+
+class SufficientStats:
+    """Dense (country, year, income group, measure) arrays of sums and counts."""
+
+    def __init__(self, data, measures, region_column="region"):
+        self.measures = list(measures)
+        country_codes, self.countries = pd.factorize(data["country"].astype(str), sort=True)
+        year_codes, self.years = pd.factorize(data["year"], sort=True)
+        label_codes, self.labels = pd.factorize(data["ig_label"].astype(str), sort=True)
+
+        values = data[self.measures].to_numpy(dtype="float64")
+        present = ~np.isnan(values)
+
+        shape = (len(self.countries), len(self.years), len(self.labels), len(self.measures))
+        self.sums = np.zeros(shape)
+        self.counts = np.zeros(shape, dtype="int64")
+        cells = (country_codes, year_codes, label_codes)
+        np.add.at(self.sums, cells, np.where(present, values, 0.0))
+        np.add.at(self.counts, cells, present)
+
+        # Each country belongs to one region
+        regions = data[region_column].astype(str).to_numpy()
+        self.regions = pd.Series(regions[np.unique(country_codes, return_index=True)[1]], index=self.countries)
+
+    def country_positions(self, regions=None, countries=None):
+        """Positions of the countries matching both filters; ``None`` means all."""
+        keep = np.ones(len(self.countries), dtype=bool)
+        if regions is not None:
+            keep &= self.regions.isin(regions).to_numpy()
+        if countries is not None:
+            keep &= self.countries.isin(countries)
+        return np.flatnonzero(keep)
+
+    def _label_positions(self, labels):
+        return np.flatnonzero(self.labels.isin(labels))
+
+    def _totals(self, country_positions, labels):
+        """Sums and counts of the selection, shaped (year, income group, measure)."""
+        label_positions = self._label_positions(labels)
+        sums = self.sums[country_positions][:, :, label_positions].sum(axis=0)
+        counts = self.counts[country_positions][:, :, label_positions].sum(axis=0)
+        return sums, counts, self.labels[label_positions]
+
+    def means_by_year_label(self, country_positions, labels, measure):
+        """Mean of ``measure`` per (year, income group), like a groupby-mean."""
+        sums, counts, label_names = self._totals(country_positions, labels)
+        m = self.measures.index(measure)
+        year_index, label_index = np.nonzero(counts[:, :, m])
+        return pd.DataFrame({
+            "year": self.years[year_index],
+            "ig_label": label_names[label_index],
+            measure: sums[year_index, label_index, m] / counts[year_index, label_index, m],
+        })
+
+    def latest_means(self, country_positions, labels):
+        """Latest year with data in the selection and each measure's mean in it.
+
+        Returns ``(None, {})`` when the selection has no data.
+        """
+        sums, counts, _ = self._totals(country_positions, labels)
+        years_with_data = np.flatnonzero(counts.sum(axis=(1, 2)))
+        if len(years_with_data) == 0:
+            return None, {}
+        latest = years_with_data[-1]
+        year_sums, year_counts = sums[latest].sum(axis=0), counts[latest].sum(axis=0)
+        means = {
+            measure: year_sums[m] / year_counts[m] if year_counts[m] else np.nan
+            for m, measure in enumerate(self.measures)
+        }
+        return self.years[latest], means
+
+    def has_data(self, country_positions, labels):
+        _, counts, _ = self._totals(country_positions, labels)
+        return bool(counts.any())
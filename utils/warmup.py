@@ -0,0 +1,119 @@
+# coding: utf-8
+
+"""Background warm-up of the page caches, started by the landing page.
+
+While Hello.py renders, a daemon thread loads and types every dataset the
+pages use and builds the default view of each page (first pollutant, all
+regions, all income groups) through the same loaders and figure-cache keys
+the pages use, so the first navigation away from the landing page is served
+from warm caches. The thread carries the landing page's script context so
+``st.cache_resource`` works from it; nothing is drawn from it.
+"""
+
+import importlib
+import logging
+import threading
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from utils.assets import image_variant
+from utils.page_data import (
+    INCOME_GROUPS, WHO_YEAR, air_figure, air_selection, gni_view_figure, load_gni_regressions,
+    load_stats_index, load_store_cube, load_store_options, load_who_cube, who_figure, who_mean_levels,
+    who_selection
+)
+from utils.registry import datasets
+from utils.standards import who_standards
+from utils.store import open_store
+
+logger = logging.getLogger(__name__)
+
+# Images shown on first render, at the width the pages request
+WARM_IMAGES = [("images/attributed_deaths_for_different_causes.jpg", 700)]
+
+
+def warm_air_pollution_impact():
+    dataset = datasets.get("global_burden")
+    stats = load_stats_index(dataset.version, dataset.frame)
+    countries = stats.country_positions(regions=None, countries=None)
+    if stats.has_data(countries, INCOME_GROUPS):
+        selection = air_selection(['All'], ['All'], INCOME_GROUPS)
+        air_figure(stats, countries, INCOME_GROUPS, selection, dataset.version)
+
+
+def warm_who_standards_countries():
+    store = open_store("who_standards")
+    if store is None:
+        dataset = datasets.get("who_standards")
+        if dataset.frame.empty:
+            return
+        version = dataset.version
+        pollutant = sorted(dataset.frame['air_pollutant'].unique().tolist())[0]
+        cube = load_who_cube(version, dataset.frame)
+    else:
+        version = store.version
+        pollutant = load_store_options(version, WHO_YEAR)[1][0]
+        cube = load_store_cube(version, WHO_YEAR, pollutant)
+
+    df_mean_levels = who_mean_levels(cube, pollutant, None)
+    if pollutant in who_standards and not df_mean_levels.empty:
+        who_figure(df_mean_levels, pollutant, who_selection(None, pollutant), version)
+
+
+def warm_gni_vs_air_pollution():
+    dataset = datasets.get("air_quality_gni")
+    df = dataset.frame
+    if df.empty:
+        return
+    fits = load_gni_regressions(dataset.version, df)
+    pollutant = sorted(df['air_pollutant'].unique().tolist())[0]
+    year = max(df['year'].unique().tolist())
+    try:
+        group_fits = fits.loc[(pollutant, year, 'All')]
+    except KeyError:
+        return
+    gni_view_figure(df, group_fits, pollutant, year, 'All', dataset.version)
+
+
+WARMERS = [warm_air_pollution_impact, warm_who_standards_countries, warm_gni_vs_air_pollution]
+
+
+def warm_all():
+    """Build every page's default view; one failing page does not stop the others."""
+    for source, width in WARM_IMAGES:
+        try:
+            image_variant(source, width)
+        except Exception:
+            logger.exception("Warming image %s failed", source)
+    for warm in WARMERS:
+        try:
+            warm()
+        except Exception:
+            logger.exception("Warm-up %s failed", warm.__name__)
+    logger.info("Page caches warmed")
+
+
+def _import_json_engine():
+    # plotly returns its optional JSON engine straight from sys.modules, without
+    # the import lock, so a page serializing a figure while the warm-up thread
+    # is still importing it would get a half-initialized module
+    try:
+        importlib.import_module("orjson")
+    except ImportError:
+        pass
+
+
+_warmup = None
+_start_lock = threading.Lock()
+
+
+def start_warmup():
+    """Start the warm-up thread once per process, from a script run."""
+    global _warmup
+    with _start_lock:
+        if _warmup is None:
+            _import_json_engine()
+            _warmup = threading.Thread(target=warm_all, name="cache-warmup", daemon=True)
+            add_script_run_ctx(_warmup, get_script_run_ctx())
+            _warmup.start()
+    return _warmup